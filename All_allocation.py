@@ -1,216 +1,223 @@
-# import os
-# import json
-# import time
-# import traceback
-# import pandas as pd
-# import gspread
-# from google.oauth2.service_account import Credentials
-
-# # ===========================
-# # 🔐 Google Sheets Auth Setup
-# # ===========================
-# SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-
-# # First try environment variable, else use local JSON file
-# key_data = os.environ.get("ACCOUNT_KEY_JSON")
-
-# if key_data:
-#     creds_dict = json.loads(key_data)
-#     creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-#     print("✅ Using credentials from environment variable.")
-# else:
-#     SERVICE_ACCOUNT_FILE = r"C:\Users\skuma\OneDrive\Desktop\Python\rare-sunrise-446516-u4-897494306ac4.json"
-#     if not os.path.exists(SERVICE_ACCOUNT_FILE):
-#         raise Exception("❌ No ACCOUNT_KEY_JSON env variable or local key file found.")
-#     creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-#     print("✅ Using local service account file.")
-
-# # ===========================
-# # 📄 Sheet Configuration
-# # ===========================
-# DEST_SHEET_URL = "https://docs.google.com/spreadsheets/d/1HGkBcL4mxgrTs5wNhWz9OgALIE-2pMoZ_P8P2vCsIls/edit?gid=1842610227#gid=1842610227"
-# DEST_SPREADSHEET_ID = "1HGkBcL4mxgrTs5wNhWz9OgALIE-2pMoZ_P8P2vCsIls"
-
-# # Source Sheets and destination tabs mapping
-# SOURCES = [
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1z1EsD9S4yIjn3MNAAjvdsApw3T6R-K8KuJf2s1rnkgE/edit",
-#         "sheet_name": "raw_leads",
-#         "columns": "A:AC",
-#         "destination": "FSE"
-#     },
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1z1EsD9S4yIjn3MNAAjvdsApw3T6R-K8KuJf2s1rnkgE/edit",
-#         "sheet_name": "Exception_File",
-#         "columns": "A:S",
-#         "destination": "Exception_File"
-#     },
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1AYOZnHLQBi7GIqn1PdTNNRko5gwtngJZZhB_UCHPQPo/edit",
-#         "sheet_name": "raw_leads",
-#         "columns": "A:AC",
-#         "destination": "Vendor"
-#     },
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1fcHmuexLkj_Rjxai38aSewk76lcls-O9EDR1VGPul5w/edit",
-#         "sheet_name": "New Joins",
-#         "columns": "A:Q",
-#         "destination": "Telecalling"
-#     },
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1MHG10SDEYoeBfq512t_rkBb7lpUvBD3XNRCLUrv0MCc/edit",
-#         "sheet_name": "Raw_Data",
-#         "columns": "A:AC",
-#         "destination": "Referal",
-#         "filter_column": 3  # zero-based index (D column)
-#     },
-#     {
-#         "url": "https://docs.google.com/spreadsheets/d/1jmqNQt1VIKCAFCg9qBhkeYr1zrNg54Q-9c1PHY_bb5w/edit",
-#         "sheet_name": "Rejoinings",
-#         "columns": "A:P",
-#         "destination": "Rejoin"
-#     }
-# ]
-
-# # ======================================
-# # 🧩 Helper Functions for Data Handling
-# # ======================================
-
-# def get_data_from_source(client, url, sheet_name, columns, filter_column=2):
-#     """Fetch data from a source Google Sheet and filter for 'Delhi NCR'."""
-#     try:
-#         print(f"📥 Reading data from: {sheet_name} | {url}")
-#         sheet = client.open_by_url(url).worksheet(sheet_name)
-#         data = sheet.get(columns, value_render_option='UNFORMATTED_VALUE')
-
-#         df = pd.DataFrame(data)
-#         if df.empty or len(df.columns) <= filter_column:
-#             print("⚠️ No usable data or filter column out of range.")
-#             return pd.DataFrame(), []
-
-#         headers = df.iloc[0].tolist()
-#         df = df.iloc[1:]  # remove header row
-
-#         # Filter for Delhi NCR (case-insensitive)
-#         df_filtered = df[df.iloc[:, filter_column].astype(str).str.strip().str.lower() == "delhi ncr"]
-#         print(f"✅ Rows after filter: {len(df_filtered)}")
-#         return df_filtered, headers
-
-#     except Exception:
-#         print("❌ Error while fetching data:")
-#         traceback.print_exc()
-#         return pd.DataFrame(), []
-
-
-# def update_destination(client, destination_url, sources):
-#     """Merge data into the destination Google Sheet."""
-#     try:
-#         print("📂 Opening destination spreadsheet...")
-#         dest_sheet = client.open_by_url(destination_url)
-
-#         for source in sources:
-#             print(f"\n🚀 Processing source: {source['destination']}")
-#             df_filtered, headers = get_data_from_source(
-#                 client,
-#                 source["url"],
-#                 source["sheet_name"],
-#                 source["columns"],
-#                 source.get("filter_column", 2)
-#             )
-
-#             if df_filtered.empty:
-#                 print(f"⚠️ No data found for {source['destination']}")
-#                 continue
-
-#             # Get or create destination worksheet
-#             try:
-#                 dest_worksheet = dest_sheet.worksheet(source["destination"])
-#             except gspread.exceptions.WorksheetNotFound:
-#                 print(f"🆕 Sheet not found. Creating: {source['destination']}")
-#                 dest_worksheet = dest_sheet.add_worksheet(title=source["destination"], rows="1000", cols=str(len(headers)))
-
-#             print(f"🧹 Clearing old data...")
-#             dest_worksheet.clear()
-
-#             print(f"✍️ Writing headers and {len(df_filtered)} rows...")
-#             dest_worksheet.append_row(headers)
-#             dest_worksheet.append_rows(df_filtered.values.tolist())
-
-#             print(f"✅ Updated successfully: {source['destination']}")
-
-#     except Exception:
-#         print("💥 Error while updating destination:")
-#         traceback.print_exc()
-
-
-# def import_new_joining(client):
-#     """Special import for 'New Joining' tab (preserves Column U)."""
-#     try:
-#         print("\n⚙️ Running special import: New Joining")
-#         source_spreadsheet_id = "1o6nrw8zgg48q1Qbn01J23M8ePYel9IraqXCcuUPMwlM"
-#         destination_sheet_name = "New Joining"
-
-#         # Open source sheet
-#         source_ss = client.open_by_key(source_spreadsheet_id)
-#         source_sheet = source_ss.worksheet("Raw Data")
-
-#         # Get data
-#         source_data = source_sheet.get_values(value_render_option='UNFORMATTED_VALUE')
-#         if not source_data:
-#             print("⚠️ No data found in source sheet.")
-#             return
-
-#         headers = source_data[0]
-#         filtered_rows = [row for row in source_data[1:] if row and row[0].strip().lower() == "delhi ncr"]
-
-#         if not filtered_rows:
-#             print("⚠️ No matching data found (Delhi NCR).")
-#             return
-
-#         filtered_data = [headers] + filtered_rows
-
-#         # Open destination sheet
-#         destination_ss = client.open_by_key(DEST_SPREADSHEET_ID)
-#         destination_sheet = destination_ss.worksheet(destination_sheet_name)
-
-#         # Preserve existing column U
-#         existing_column_u = destination_sheet.col_values(21)
-
-#         destination_sheet.batch_clear(["A1:U"])
-#         new_data = []
-
-#         for i, row in enumerate(filtered_data):
-#             row = row[:21] + [""] * (21 - len(row))
-#             if i < len(existing_column_u):
-#                 row[20] = existing_column_u[i]
-#             new_data.append(row)
-
-#         destination_sheet.update(f"A1:U{len(new_data)}", new_data)
-
-#         destination_sheet.format("A1:U1", {
-#             "backgroundColor": {"red": 0.26, "green": 0.52, "blue": 0.96},
-#             "textFormat": {"foregroundColor": {"red": 1, "green": 1, "blue": 1}, "bold": True}
-#         })
-
-#         print(f"✅ {len(filtered_data) - 1} rows imported successfully to '{destination_sheet_name}'.")
-
-#     except Exception:
-#         print("❌ Error in import_new_joining:")
-#         traceback.print_exc()
-
-
-# def main():
-#     print("🚀 Script started...")
-#     try:
-#         client = gspread.authorize(creds)
-#         update_destination(client, DEST_SHEET_URL, SOURCES)
-#         import_new_joining(client)
-#         print("\n🎉 Script finished successfully!")
-#     except Exception:
-#         print("💥 Fatal error during initialization:")
-#         traceback.print_exc()
-
-
-# if __name__ == "__main__":
-#     main()
-
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from gspread.utils import extract_id_from_url
+
+import gsheet_client
+import tracing
+from change_detect import SourceWatch
+from pipeline import Job
+from sheet_sync import WritePlan
+
+# ===========================
+# 📄 Sheet Configuration
+# ===========================
+DEST_SPREADSHEET_ID = "1HGkBcL4mxgrTs5wNhWz9OgALIE-2pMoZ_P8P2vCsIls"
+
+# destination tabs written side by side
+WRITE_WORKERS = int(os.environ.get("ALLOCATION_WRITE_WORKERS", "4"))
+
+# Source Sheets and destination tabs mapping
+SOURCES = [
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1z1EsD9S4yIjn3MNAAjvdsApw3T6R-K8KuJf2s1rnkgE/edit",
+        "sheet_name": "raw_leads",
+        "columns": "A:AC",
+        "destination": "FSE"
+    },
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1z1EsD9S4yIjn3MNAAjvdsApw3T6R-K8KuJf2s1rnkgE/edit",
+        "sheet_name": "Exception_File",
+        "columns": "A:S",
+        "destination": "Exception_File"
+    },
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1AYOZnHLQBi7GIqn1PdTNNRko5gwtngJZZhB_UCHPQPo/edit",
+        "sheet_name": "raw_leads",
+        "columns": "A:AC",
+        "destination": "Vendor"
+    },
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1fcHmuexLkj_Rjxai38aSewk76lcls-O9EDR1VGPul5w/edit",
+        "sheet_name": "New Joins",
+        "columns": "A:Q",
+        "destination": "Telecalling"
+    },
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1MHG10SDEYoeBfq512t_rkBb7lpUvBD3XNRCLUrv0MCc/edit",
+        "sheet_name": "Raw_Data",
+        "columns": "A:AC",
+        "destination": "Referal",
+        "filter_column": 3  # zero-based index (D column)
+    },
+    {
+        "url": "https://docs.google.com/spreadsheets/d/1jmqNQt1VIKCAFCg9qBhkeYr1zrNg54Q-9c1PHY_bb5w/edit",
+        "sheet_name": "Rejoinings",
+        "columns": "A:P",
+        "destination": "Rejoin"
+    }
+]
+
+# 'New Joining' keeps the hand-filled column U of the destination
+NEW_JOINING = {
+    "spreadsheet_id": "1o6nrw8zgg48q1Qbn01J23M8ePYel9IraqXCcuUPMwlM",
+    "sheet_name": "Raw Data",
+    "columns": "A:U",
+    "destination": "New Joining",
+    "filter_column": 0,
+    "keep_column": 20,  # zero-based index (U column)
+}
+
+HEADER_FORMAT = {
+    "backgroundColor": {"red": 0.26, "green": 0.52, "blue": 0.96},
+    "textFormat": {"foregroundColor": {"red": 1, "green": 1, "blue": 1}, "bold": True},
+}
+
+
+# ======================================
+# 🧩 Helper Functions for Data Handling
+# ======================================
+
+def filter_delhi_ncr(data, filter_column=2):
+    """Header row + rows whose filter column is 'Delhi NCR' (case-insensitive), as lists."""
+    if not data or max(len(r) for r in data) <= filter_column:
+        print("⚠️ No usable data or filter column out of range.")
+        return [], []
+
+    headers = data[0]
+    # object dtype keeps the sheet's own ints / floats / strings; short rows are padded with None
+    df = pd.DataFrame(data[1:], dtype=object)
+    if df.empty or len(df.columns) <= filter_column:
+        return headers, []
+
+    mask = df[filter_column].astype(str).str.strip().str.lower().eq("delhi ncr")
+    return headers, df[mask].values.tolist()
+
+
+def fetch_all():
+    """
+    Every source range plus the destination's column U in one batch_get: one
+    values:batchGet per spreadsheet (so the two 1z1Es… tabs share a call), with
+    the spreadsheets fetched concurrently.
+    """
+    requests = [(extract_id_from_url(s["url"]), s["sheet_name"], s["columns"]) for s in SOURCES]
+    requests.append((NEW_JOINING["spreadsheet_id"], NEW_JOINING["sheet_name"], NEW_JOINING["columns"]))
+    requests.append((DEST_SPREADSHEET_ID, NEW_JOINING["destination"], "U:U"))
+
+    grids = gsheet_client.batch_get(requests, value_render_option="UNFORMATTED_VALUE")
+    return grids[:len(SOURCES)], grids[-2], grids[-1]
+
+
+def new_joining_rows(source_data, existing_column_u):
+    """Filtered 'New Joining' block (A:U) with the destination's column U carried over."""
+    headers, rows = filter_delhi_ncr(source_data, NEW_JOINING["filter_column"])
+    if not rows:
+        print("⚠️ No matching data found (Delhi NCR).")
+        return []
+
+    keep = NEW_JOINING["keep_column"]
+    width = keep + 1
+    existing = [r[0] if r else "" for r in existing_column_u]
+
+    new_data = []
+    for i, row in enumerate([headers] + rows):
+        row = list(row[:width]) + [""] * (width - len(row))
+        if i < len(existing):
+            row[keep] = existing[i]
+        new_data.append(row)
+    return new_data
+
+
+def write_destinations(blocks, new_joining, checkpoint=None):
+    """
+    One WritePlan (clear + write in a single batchUpdate) per destination tab,
+    all executed concurrently. Returns the names of the tabs that failed (empty
+    when every tab was written); tabs a failed earlier run already wrote are
+    skipped via `checkpoint`.
+    """
+    dest = gsheet_client.open_spreadsheet(DEST_SPREADSHEET_ID)
+    tabs = {ws.title: ws for ws in dest.worksheets()}
+
+    plans = {}
+    for name, data in blocks.items():
+        worksheet = tabs.get(name)
+        if worksheet is None:
+            print(f"🆕 Sheet not found. Creating: {name}")
+            worksheet = dest.add_worksheet(title=name, rows=max(1000, len(data)), cols=max(len(r) for r in data))
+        plans[name] = WritePlan(dest).clear(worksheet).update(worksheet, "A1", data)
+
+    if new_joining:
+        worksheet = tabs[NEW_JOINING["destination"]]
+        plans[NEW_JOINING["destination"]] = WritePlan(dest) \
+            .clear(worksheet, "A1:U") \
+            .update(worksheet, "A1", new_joining) \
+            .format(worksheet, "A1:U1", HEADER_FORMAT)
+
+    def execute(item):
+        name, plan = item
+        try:
+            plan.execute(checkpoint, step=f"{name}:")
+            print(f"✅ Updated successfully: {name}")
+            return True
+        except Exception:
+            print(f"❌ Error while updating destination: {name}")
+            traceback.print_exc()
+            return False
+
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+        written = list(pool.map(tracing.carry(execute), plans.items()))
+    return [name for name, ok in zip(plans, written) if not ok]
+
+
+def main():
+    print("🚀 Script started...")
+    tracing.phase("fetch")
+    source_ids = sorted({extract_id_from_url(s["url"]) for s in SOURCES} | {NEW_JOINING["spreadsheet_id"]})
+    watch = SourceWatch("All_allocation", source_ids)
+    if watch.skip_read():
+        return
+
+    source_grids, new_joining_data, existing_column_u = fetch_all()
+
+    tracing.phase("transform")
+    blocks = {}
+    for source, data in zip(SOURCES, source_grids):
+        print(f"\n🚀 Processing source: {source['destination']}")
+        headers, rows = filter_delhi_ncr(data, source.get("filter_column", 2))
+        print(f"✅ Rows after filter: {len(rows)}")
+        if not rows:
+            print(f"⚠️ No data found for {source['destination']}")
+            continue
+        blocks[source["destination"]] = [headers] + rows
+
+    print("\n⚙️ Running special import: New Joining")
+    new_joining = new_joining_rows(new_joining_data, existing_column_u)
+
+    tracing.phase("write")
+    if watch.skip_write(blocks, new_joining):
+        watch.commit()
+        return
+
+    failed = write_destinations(blocks, new_joining, watch.checkpoint())
+    if failed:
+        # no commit: the next run retries, skipping the tabs the checkpoint has as written
+        raise RuntimeError(f"destination write failed: {', '.join(failed)}")
+    watch.commit()
+    if new_joining:
+        print(f"✅ {len(new_joining) - 1} rows imported successfully to '{NEW_JOINING['destination']}'.")
+    print("\n🎉 Script finished successfully!")
+
+
+# for runner.py
+JOBS = [
+    Job("All_allocation", main,
+        reads=[s["sheet_name"] for s in SOURCES] + [NEW_JOINING["sheet_name"]],
+        writes=[s["destination"] for s in SOURCES] + [NEW_JOINING["destination"]]),
+]
+
+
+if __name__ == "__main__":
+    with tracing.job("All_allocation"):
+        main()
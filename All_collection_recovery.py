@@ -1,205 +1,338 @@
-import gspread
-import pandas as pd
-from google.oauth2.service_account import Credentials
-from datetime import datetime
-import os, json
+from datetime import datetime, timedelta
+import archive
+import async_sheets
+import gsheet_client
+import state_store
+import tracing
+from change_detect import SourceWatch
+from row_spec import Equals, Map, NoneOf, NotEmpty, Number, OneOf, RowSpec, folded, letters
+from sheet_sync import WritePlan, project_rows
+from table import Table
+from pipeline import Job, run_jobs
 
 
-# ===== AUTH SETUP =====
-def get_gsheet_client():
-    """
-    Returns an authorized gspread client.
-    Works both locally (file) and in GitHub Actions (env variable).
-    """
-    SCOPES = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-
-    key_data = os.environ.get("ACCOUNT_KEY_JSON")
-    SERVICE_ACCOUNT_FILE = r"C:\Users\skuma\Desktop\Python\Account key.json"
+# ===== OS SUMMARY COLLECTION =====
+OS_SUMMARY_CITIES = ["delhi ncr", "sukhrali", "noida", "delhi"]
 
-    creds = None
+# OS_ETM_Summary A:Q: two title rows, headers in row 3, then the rows of OS_SUMMARY_CITIES
+OS_SUMMARY = RowSpec(
+    columns=letters("A", "Q"), skip=2, header=1,
+    where=[OneOf(1, OS_SUMMARY_CITIES, normalize=folded)],
+).compile()
 
-    if key_data:
-        print("🔐 Using service account from environment variable (GitHub Actions)")
-        try:
-            creds_dict = json.loads(key_data)
-            creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-            print("✅ Service account loaded from secret.")
-        except Exception as e:
-            raise ValueError(f"❌ Failed to load service account from env: {e}")
+def ossummarycollection():
+    print("\n▶️ Running ossummarycollection...")
+    source_id = "1D4LjhxfaBpV1zUSCrQ7Xfe2NpeNRNgSdli16lh4anlo"
+    target_id = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
+    source_tab = "OS_ETM_Summary"
+    target_tab = "OS_Collection"
+
+    tracing.phase("fetch")
+    watch = SourceWatch("ossummarycollection", [source_id])
+    replay = archive.replay_date()
+    if replay is None and watch.skip_read():
+        return
+
+    sheets = async_sheets.default()
+    if replay:
+        print(f"ℹ️ Reading {source_tab} as archived on {replay}")
+        data = archive.load(source_tab, replay).to_rows()
+        target = gsheet_client.open_worksheet(target_id, target_tab)
+    else:
+        # source read and target lookup hit different spreadsheets: overlap them
+        data, target = async_sheets.run(
+            sheets.get(source_id, source_tab, OS_SUMMARY.spec.range),
+            sheets.call(gsheet_client.open_worksheet, target_id, target_tab),
+        )
+        archive.save(source_tab, data)
+    if len(data) <= 2:
+        print("⚠️ No data found to copy.")
+        return
+
+    tracing.phase("transform")
+    headers, *filtered = OS_SUMMARY.filter(data)
+
+    print(f"✅ Filtered rows: {len(filtered)}")
+
+    tracing.phase("write")
+    if not watch.skip_write(headers, filtered):
+        # clear + headers + rows in one atomic batchUpdate
+        WritePlan(target.spreadsheet) \
+            .clear(target, "A:Q") \
+            .update(target, "A1", [headers]) \
+            .update(target, "A2", filtered) \
+            .execute(watch.checkpoint())
+        print("✅ OS Collection updated successfully!\n")
+    state_store.default_store().set(OS_COLLECTION_INDEX, build_date_index(filtered, first_row=2))
+    watch.commit()
 
-    elif os.path.exists(SERVICE_ACCOUNT_FILE):
-        print("💾 Using local service account file")
-        creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    # typed rows for importCNGOSCollectionFast when both run in this process
+    return [headers] + filtered
 
-    else:
-        raise FileNotFoundError("❌ Service account credentials not found.")
 
-    client = gspread.authorize(creds)
-    return client
+# ===== RECOVERY UPDATE =====
+LEASING = RowSpec(columns=list("ABCDEFG")).compile()
+# Revshare without column C; header + rows with column A set
+REVSHARE = RowSpec(columns=list("ABDEFGH"), header=1, where=[NotEmpty(0)]).compile()
 
+def updateRecovery():
+    print("\n▶️ Running updateRecovery...")
+    source_id = "1D4LjhxfaBpV1zUSCrQ7Xfe2NpeNRNgSdli16lh4anlo"
+    target_id = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
+
+    leasing_tab = "Leasing_Raw"
+    revshare_tab = "Revshare_Raw"
+    target_tab = "Recovery"
+
+    tracing.phase("fetch")
+    watch = SourceWatch("updateRecovery", [source_id])
+    replay = archive.replay_date()
+    if replay is None and watch.skip_read():
+        return
+
+    sheets = async_sheets.default()
+    if replay:
+        print(f"ℹ️ Reading {leasing_tab} / {revshare_tab} as archived on {replay}")
+        leasing_data, rev_data = archive.load(leasing_tab, replay), archive.load(revshare_tab, replay)
+        recovery_sheet = gsheet_client.open_worksheet(target_id, target_tab)
+    else:
+        # Both source tabs in one batchGet, overlapped
+        # with the Recovery lookup in the other spreadsheet
+        (leasing_data, rev_data), recovery_sheet = async_sheets.run(
+            sheets.call(
+                gsheet_client.batch_get_columns,
+                [LEASING.spec.request(source_id, leasing_tab), REVSHARE.spec.request(source_id, revshare_tab)],
+                value_render_option="UNFORMATTED_VALUE",
+            ),
+            sheets.call(gsheet_client.open_worksheet, target_id, target_tab),
+        )
+        archive.save(leasing_tab, leasing_data)
+        archive.save(revshare_tab, rev_data)
+
+    tracing.phase("write")
+    if watch.skip_write(leasing_data, rev_data):
+        watch.commit()
+        return
+
+    # Clear old data + both blocks: one atomic batchUpdate
+    plan = WritePlan(recovery_sheet.spreadsheet).clear(recovery_sheet, "A:G")
+
+    # Copy leasing data
+    if not leasing_data:
+        print("⚠️ No leasing data found.")
+    else:
+        plan.update(recovery_sheet, "A1", leasing_data)
+        print(f"✅ Leasing data copied ({len(leasing_data)} rows)")
 
-# ===== OS SUMMARY COLLECTION =====
-def ossummarycollection():
-    print("\n▶️ Running ossummarycollection...")
-    try:
-        source_id = "1D4LjhxfaBpV1zUSCrQ7Xfe2NpeNRNgSdli16lh4anlo"
-        target_id = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
-        source_tab = "OS_ETM_Summary"
-        target_tab = "OS_Collection"
+    # Copy revshare data
+    if not rev_data:
+        print("⚠️ No revshare data found.")
+    else:
+        # a view over the fetched columns
+        final_data = REVSHARE.apply(rev_data)
+        start_row = len(leasing_data) + 3 if leasing_data else 2
+        plan.update(recovery_sheet, f"A{start_row}", final_data)
+        print(f"✅ Revshare data appended ({len(final_data)} rows)")
 
-        client = get_gsheet_client()
-        source = client.open_by_key(source_id).worksheet(source_tab)
-        target = client.open_by_key(target_id).worksheet(target_tab)
+    plan.execute(watch.checkpoint())
+    watch.commit()
+    print("🎯 Recovery sheet updated successfully!\n")
 
-        data = source.get("A:Q", value_render_option="UNFORMATTED_VALUE")
-        if len(data) <= 2:
-            print("⚠️ No data found to copy.")
-            return
 
-        headers = data[2]  # Row 3 = headers
-        rows = data[3:]    # Row 4 onwards
+# ===== CNG OS COLLECTION =====
+SHEETS_EPOCH = datetime(1899, 12, 30)
 
-        filtered = [
-            row for row in rows
-            if len(row) > 1 and str(row[1]).strip().lower() in ["delhi ncr", "sukhrali", "noida", "delhi"]
-        ]
+# OS_Collection columns transform_cng_os uses, in the order it expects them
+OS_COLLECTION_COLUMNS = ["A", "B", "C", "D", "E", "F", "K", "R", "S", "T"]
 
-        print(f"✅ Filtered rows: {len(filtered)}")
+# state-store key of the {date: row ranges} index ossummarycollection keeps for OS_Collection
+OS_COLLECTION_INDEX = "index:OS_Collection"
+# above this many row ranges for one day, one spanning range is read instead
+OS_INDEX_MAX_RANGES = 20
 
-        target.batch_clear(["A:Q"])
-        target.update("A1:Q1", [headers])
-        if filtered:
-            target.update(f"A2:Q{len(filtered)+1}", filtered)
 
-        print("✅ OS Collection updated successfully!\n")
-    except Exception as e:
-        print(f"❌ ossummarycollection failed: {e}")
+def _parse_os_date(value):
+    """OS_Collection date cell -> date: 'dd/mm/yyyy' text, or a serial number for typed rows."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (SHEETS_EPOCH + timedelta(days=value)).date()
+    return datetime.strptime(value, "%d/%m/%Y").date()
 
 
-# ===== RECOVERY UPDATE =====
-def updateRecovery():
-    print("\n▶️ Running updateRecovery...")
+def _row_date(value):
     try:
-        source_id = "1D4LjhxfaBpV1zUSCrQ7Xfe2NpeNRNgSdli16lh4anlo"
-        target_id = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
+        return _parse_os_date(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _os_date_text(value):
+    """Date cell as CNG_OS_Summary shows it: text as is, serial numbers as dd/mm/yyyy."""
+    return value if isinstance(value, str) else _parse_os_date(value).strftime("%d/%m/%Y")
+
+
+# OS_Collection (OS_COLLECTION_COLUMNS, header first) -> CNG_OS_Summary E:N for the
+# date passed as `day`, skipping Delhi NCR
+CNG_OS = RowSpec(
+    columns=OS_COLLECTION_COLUMNS, skip=1,
+    where=[Equals(0, param="day", normalize=_parse_os_date), NoneOf(1, ["Delhi NCR"])],
+    select=[
+        3,                      # Column E
+        Map(0, _os_date_text),  # Date
+        1,                      # Location
+        2,                      # Something else
+        5,                      # Name
+        Number(4), Number(6), Number(7), Number(8), Number(9),
+    ],
+).compile()
+
+
+def build_date_index(rows, first_row):
+    """{'yyyy-mm-dd': [[first, last], ...]} sheet row ranges per date of column A."""
+    index = {}
+    for i, row in enumerate(rows):
+        day = _row_date(row[0]) if row else None
+        if day is None:
+            continue
+        ranges = index.setdefault(day.isoformat(), [])
+        n = first_row + i
+        if ranges and ranges[-1][1] == n - 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return {"dates": index}
 
-        leasing_tab = "Leasing_Raw"
-        revshare_tab = "Revshare_Raw"
-        target_tab = "Recovery"
 
-        client = get_gsheet_client()
-        source = client.open_by_key(source_id)
-        target = client.open_by_key(target_id)
+def read_os_collection_day(spreadsheet_id, tab, filter_date):
+    """
+    OS_Collection rows (header first) for `filter_date`, using the date index so only
+    that day's row ranges are fetched (one spanning range when the day is scattered
+    over more than OS_INDEX_MAX_RANGES pieces). Every range carries one extra row on
+    each side; if any fetched row disagrees with the index about the date, the tab
+    changed behind it and the whole tab is read instead.
+
+    A date the index does not know is confirmed against column A alone: the index
+    lives in per-workflow state and may predate the rows of that day.
+    """
+    index = state_store.default_store().get(OS_COLLECTION_INDEX)
+    if index is not None:
+        ranges = index["dates"].get(filter_date.isoformat(), [])
+        print(f"ℹ️ OS_Collection index: {len(ranges)} row range(s) for {filter_date:%d/%m/%Y}")
+        if ranges:
+            blocks = [(max(first - 1, 2), last + 1) for first, last in ranges]
+            if len(blocks) > OS_INDEX_MAX_RANGES:
+                blocks = [(blocks[0][0], blocks[-1][1])]
+            grids = gsheet_client.batch_get_columns(
+                [(spreadsheet_id, tab, OS_COLLECTION_COLUMNS, block) for block in blocks]
+            )
+
+            expected = {n for first, last in ranges for n in range(first, last + 1)}
+            fresh = True
+            for (top, bottom), grid in zip(blocks, grids):
+                dates = grid.column(0)
+                for n in range(top, bottom + 1):
+                    value = dates[n - top] if n - top < len(dates) else ""
+                    if (_row_date(value) == filter_date) != (n in expected):
+                        fresh = False
+            if fresh:
+                return Table.concat([Table([[""] for _ in OS_COLLECTION_COLUMNS])] + grids)
+            print("⚠️ OS_Collection changed since it was indexed, reading the whole tab")
+        else:
+            dates, = gsheet_client.batch_get_columns([(spreadsheet_id, tab, ["A"], (2, ""))])
+            if not any(_row_date(value) == filter_date for value in dates.column(0)):
+                return Table([[""] for _ in OS_COLLECTION_COLUMNS])  # header only
+            print("⚠️ OS_Collection has rows for a date its index does not know, reading the whole tab")
 
-        leasing_sheet = source.worksheet(leasing_tab)
-        revshare_sheet = source.worksheet(revshare_tab)
-        recovery_sheet = target.worksheet(target_tab)
+    data, = gsheet_client.batch_get_columns([(spreadsheet_id, tab, OS_COLLECTION_COLUMNS)])
+    return data
 
-        # Clear old data
-        recovery_sheet.batch_clear(["A:G"])
 
-        # Copy leasing data
-        leasing_data = leasing_sheet.get("A:G", value_render_option="UNFORMATTED_VALUE")
-        if not leasing_data:
-            print("⚠️ No leasing data found.")
-        else:
-            recovery_sheet.update(f"A1:G{len(leasing_data)}", leasing_data)
-            print(f"✅ Leasing data copied ({len(leasing_data)} rows)")
-
-        # Copy revshare data
-        rev_data = revshare_sheet.get("A:H", value_render_option="UNFORMATTED_VALUE")
-        if not rev_data:
-            print("⚠️ No revshare data found.")
-        else:
-            filtered = [row for i, row in enumerate(rev_data) if i == 0 or row[0] != ""]
-            final_data = [[r[0], r[1], r[3], r[4], r[5], r[6], r[7]] for r in filtered]
-            start_row = len(leasing_data) + 3 if leasing_data else 2
-            recovery_sheet.update(f"A{start_row}:G{start_row + len(final_data) - 1}", final_data)
-            print(f"✅ Revshare data appended ({len(final_data)} rows)")
+def transform_cng_os(data, filter_date):
+    """
+    OS_Collection rows (header first) -> CNG_OS_Summary E:N rows for `filter_date`
+    (see CNG_OS). Each distinct date / location / amount is parsed once.
 
-        print("🎯 Recovery sheet updated successfully!\n")
-    except Exception as e:
-        print(f"❌ updateRecovery failed: {e}")
+    `data` is a Table (or rows) of OS_COLLECTION_COLUMNS only (see
+    batch_get_columns / project_rows), as formatted text or the typed values
+    ossummarycollection returns.
+    """
+    return CNG_OS.apply(data, day=filter_date).to_rows()
 
 
-# ===== CNG OS COLLECTION =====
-def importCNGOSCollectionFast():
+def importCNGOSCollectionFast(os_collection=None):
+    """
+    `os_collection` = rows handed over by ossummarycollection in the same run;
+    without it the OS_Collection tab is read.
+    """
     print("\n▶️ Running importCNGOSCollectionFast...")
-    try:
-        SOURCE_SHEET_ID = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
-        SOURCE_TAB = "OS_Collection"
-        TARGET_SHEET_ID = "1HMlQzPbqpEh2OiIZT6h5UxjfY-wmWUrLQDgahNsxzl0"
-        TARGET_TAB = "CNG_OS_Summary"
-
-        client = get_gsheet_client()
-        source = client.open_by_key(SOURCE_SHEET_ID).worksheet(SOURCE_TAB)
-        target = client.open_by_key(TARGET_SHEET_ID).worksheet(TARGET_TAB)
-
-        filter_date_str = target.acell("E1").value
-        print(f"ℹ️ Filter date in E1: {filter_date_str}")
-        if not filter_date_str:
-            print("⚠️ No date in E1. Skipping importCNGOSCollectionFast.")
-            return
-
-        filter_date = datetime.strptime(filter_date_str, "%d/%m/%Y").date()
-        data = source.get_all_values()
-        if not data:
-            print("⚠️ No source data found.")
-            return
-
-        # helper function
-        def to_number(value):
-            try:
-                value = str(value).replace(",", "").strip()
-                return round(float(value), 2)
-            except:
-                return ""
-
-        output = []
-        for s in data[1:]:
-            s = s + [""] * 21  # padding for missing cols
-            try:
-                if not s[0]:
-                    continue
-                row_date = datetime.strptime(s[0], "%d/%m/%Y").date()
-                if row_date == filter_date and s[1].strip() != "Delhi NCR":
-                    mapped = [
-                        s[3],                # Column E
-                        s[0],                # Date
-                        s[1],                # Location
-                        s[2],                # Something else
-                        s[5],                # Name
-                        to_number(s[4]),
-                        to_number(s[10]),
-                        to_number(s[17]),
-                        to_number(s[18]),
-                        to_number(s[19])
-                    ]
-                    output.append(mapped)
-            except Exception as e:
-                print(f"⚠️ Skipping row due to error: {e}")
-
-        if not output:
-            print("⚠️ No matching data found for filter date.")
-            return
-
-        last_row = len(target.get_all_values())
-        target.batch_clear([f"E3:N{last_row}"])
-        target.update("E3", output)
-
-        print(f"✅ importCNGOSCollectionFast completed. Rows: {len(output)}")
-
-    except Exception as e:
-        print(f"❌ importCNGOSCollectionFast failed: {e}")
+    SOURCE_SHEET_ID = "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"
+    SOURCE_TAB = "OS_Collection"
+    TARGET_SHEET_ID = "1HMlQzPbqpEh2OiIZT6h5UxjfY-wmWUrLQDgahNsxzl0"
+    TARGET_TAB = "CNG_OS_Summary"
+
+    tracing.phase("fetch")
+    target = gsheet_client.open_worksheet(TARGET_SHEET_ID, TARGET_TAB)
+
+    filter_date_str = target.acell("E1").value
+    print(f"ℹ️ Filter date in E1: {filter_date_str}")
+    if not filter_date_str:
+        print("⚠️ No date in E1. Skipping importCNGOSCollectionFast.")
+        return
+
+    filter_date = datetime.strptime(filter_date_str, "%d/%m/%Y").date()
+
+    # output depends on the E1 date as well as the source tab
+    watch = SourceWatch("importCNGOSCollectionFast", [SOURCE_SHEET_ID], extra=filter_date_str)
+    if os_collection is not None:
+        print(f"ℹ️ Using {len(os_collection) - 1} OS_Collection rows from ossummarycollection")
+        data = project_rows(os_collection, OS_COLLECTION_COLUMNS)
+    elif watch.skip_read():
+        return
+    else:
+        # only the ten columns the transform uses, only the rows of the E1 date
+        data = read_os_collection_day(SOURCE_SHEET_ID, SOURCE_TAB, filter_date)
+    if not data:
+        print("⚠️ No source data found.")
+        return
+
+    tracing.phase("transform")
+    output = transform_cng_os(data, filter_date)
+
+    if not output:
+        print("⚠️ No matching data found for filter date.")
+        return
+
+    tracing.phase("write")
+    if watch.skip_write(output):
+        watch.commit()
+        return
+
+    # open-ended clear: no need to download the tab to find its last row
+    WritePlan(target.spreadsheet) \
+        .clear(target, "E3:N") \
+        .update(target, "E3", output) \
+        .execute(watch.checkpoint())
+    watch.commit()
+
+    print(f"✅ importCNGOSCollectionFast completed. Rows: {len(output)}")
+
+
+# ===== PIPELINE =====
+# Each job names the tabs it reads / writes; independent jobs run in parallel.
+JOBS = [
+    Job("ossummarycollection", ossummarycollection,
+        reads=["OS_ETM_Summary"], writes=["OS_Collection"]),
+    Job("updateRecovery", updateRecovery,
+        reads=["Leasing_Raw", "Revshare_Raw"], writes=["Recovery"]),
+    Job("importCNGOSCollectionFast", importCNGOSCollectionFast,
+        reads=["OS_Collection", "CNG_OS_Summary"], writes=["CNG_OS_Summary"],
+        takes={"os_collection": "ossummarycollection"}),
+]
 
 
 # ===== MAIN EXECUTION =====
 if __name__ == "__main__":
     print("🚀 Starting All_collection_recovery.py...")
-    ossummarycollection()
-    updateRecovery()
-    importCNGOSCollectionFast()
+    report = run_jobs(JOBS)
+    if any(job["status"] != "ok" for job in report["jobs"].values()):
+        raise SystemExit("❌ Some tasks failed or were skipped")
     print("✅ All tasks completed!")
@@ -1,37 +1,71 @@
-import os
-import json
-import gspread
-from google.oauth2.service_account import Credentials
-
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-
-key_data = os.environ.get("ACCOUNT_KEY_JSON")
-if not key_data:
-    raise Exception("ACCOUNT_KEY_JSON env variable missing")
-
-creds = Credentials.from_service_account_info(
-    json.loads(key_data),
-    scopes=SCOPES
-)
-client = gspread.authorize(creds)
+import gsheet_client
+import tracing
+from change_detect import SourceWatch
+from pipeline import Job
+from sheet_sync import delta_sync, stream_copy, sync_mode
 
 SOURCE_SHEET_ID = "1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU"
 TARGET_SHEET_ID = "1fS8creQX5JyxMVeSQmsRzd0Tfm4j4m8-mZW6l6Athc4"
 
 SOURCE_TAB = "Combined CNG"
 TARGET_TAB = "Combined"
+WIDTH = 38  # A:AL
+
+# "full" = clear + rewrite everything, "delta" = insert / delete / rewrite only the rows that
+# changed, "stream" = clear + copy in row windows (STREAM_WINDOW_ROWS / STREAM_WORKERS)
+SYNC_MODE = sync_mode("COMBINED_SYNC_MODE", "full", ("full", "delta", "stream"))
+
+
+def main():
+    # Source untouched since last run -> nothing to do
+    tracing.phase("fetch")
+    watch = SourceWatch("Allocation_deallocation", [SOURCE_SHEET_ID])
+    if watch.skip_read():
+        return
+
+    # Source: A2 to AL (no header, no faltu)
+    source_ws = gsheet_client.open_worksheet(SOURCE_SHEET_ID, SOURCE_TAB)
+
+    if SYNC_MODE == "stream":
+        # never holds the whole tab in memory, so no content check either
+        tracing.phase("write")
+        target_ws = gsheet_client.open_worksheet(TARGET_SHEET_ID, TARGET_TAB)
+        stats = stream_copy(source_ws, target_ws, "A", "AL", start_row=2, checkpoint=watch.checkpoint())
+        print(f"Perfect 👍 stream copy: {stats['rows']} rows in {stats['windows']} windows")
+        watch.commit()
+        return
+
+    data = source_ws.get("A2:AL", value_render_option="UNFORMATTED_VALUE")
+
+    if not data:
+        print("Kuch bhi data nahi mila 🤷")
+        return
+
+    tracing.phase("write")
+    if watch.skip_write(data):
+        watch.commit()
+        return
+
+    target_ws = gsheet_client.open_worksheet(TARGET_SHEET_ID, TARGET_TAB)
+
+    if SYNC_MODE == "full":
+        # Target: clear + write exactly A:AL
+        target_ws.batch_clear(["A:AL"])
+        target_ws.update(range_name="A2:AL", values=data)
+        print("Perfect 👍 A:AL → A:AL transfer ho gaya")
+    else:
+        # Target: only changed / new / deleted rows, one batchUpdate
+        stats = delta_sync(target_ws, data, width=WIDTH, start_row=2)
+        print(f"Perfect 👍 delta sync: {stats['changed']} rows changed, {stats['inserted']} inserted, "
+              f"{stats['deleted']} deleted")
+
+    watch.commit()
 
-# Source: A2 to AL (no header, no faltu)
-source_ws = client.open_by_key(SOURCE_SHEET_ID).worksheet(SOURCE_TAB)
-data = source_ws.get("A2:AL", value_render_option="UNFORMATTED_VALUE")
 
-if not data:
-    print("Kuch bhi data nahi mila 🤷")
-    exit()
+# for runner.py
+JOBS = [Job("Allocation_deallocation", main, reads=[SOURCE_TAB], writes=[TARGET_TAB])]
 
-# Target: clear + write exactly A:AL
-target_ws = client.open_by_key(TARGET_SHEET_ID).worksheet(TARGET_TAB)
-target_ws.batch_clear(["A:AL"])
-target_ws.update(range_name="A2:AL", values=data)
 
-print("Perfect 👍 A:AL → A:AL transfer ho gaya")
+if __name__ == "__main__":
+    with tracing.job("Allocation_deallocation"):
+        main()
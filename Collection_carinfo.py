@@ -1,18 +1,8 @@
-import os
-import json
-import gspread
-from google.oauth2.service_account import Credentials
-
-# Setup Google Sheets authentication from environment variable
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-key_data = os.environ.get("ACCOUNT_KEY_JSON")
-
-if not key_data:
-    raise Exception("ACCOUNT_KEY_JSON environment variable not found")
-
-creds_dict = json.loads(key_data)
-creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-client = gspread.authorize(creds)
+import gsheet_client
+import tracing
+from change_detect import SourceWatch
+from pipeline import Job
+from sheet_sync import stream_copy, sync_mode
 
 
 # Source and target Google Sheets
@@ -21,17 +11,44 @@ target_sheet_id = "1HMlQzPbqpEh2OiIZT6h5UxjfY-wmWUrLQDgahNsxzl0"
 source_tab_name = "Car Info"
 target_tab_name = "Details"
 
-# Open the source sheet and fetch data from A2:K (removing apostrophes)
-print("Fetching data from A2:K in source sheet...")
-source_sheet = client.open_by_key(source_sheet_id).worksheet(source_tab_name)
-data = source_sheet.get("A2:K", value_render_option='UNFORMATTED_VALUE')  # Fetch as raw data
+# "full" = one read + one write, "stream" = copy in row windows (STREAM_WINDOW_ROWS / STREAM_WORKERS)
+SYNC_MODE = sync_mode("CARINFO_DETAILS_SYNC_MODE", "full", ("full", "stream"))
+
+
+def main():
+    # Skip the whole copy if the source spreadsheet has not changed
+    tracing.phase("fetch")
+    watch = SourceWatch("Collection_carinfo", [source_sheet_id])
+    if watch.skip_read():
+        return
+
+    # Open the source sheet and fetch data from A2:K (removing apostrophes)
+    print("Fetching data from A2:K in source sheet...")
+    source_sheet = gsheet_client.open_worksheet(source_sheet_id, source_tab_name)
+
+    if SYNC_MODE == "stream":
+        tracing.phase("write")
+        target_sheet = gsheet_client.open_worksheet(target_sheet_id, target_tab_name)
+        stats = stream_copy(source_sheet, target_sheet, "A", "K", start_row=2, checkpoint=watch.checkpoint())
+        print(f"Data successfully transferred! ({stats['rows']} rows in {stats['windows']} windows)")
+        watch.commit()
+        return
+
+    data = source_sheet.get("A2:K", value_render_option='UNFORMATTED_VALUE')  # Fetch as raw data
+
+    if not data:
+        print("No data found in A2:K.")
+        return
 
-if data:
     print(f"Fetched {len(data)} rows from A2:K.")
+    tracing.phase("write")
+    if watch.skip_write(data):
+        watch.commit()
+        return
 
     # Open the target sheet
     print("Opening target sheet...")
-    target_sheet = client.open_by_key(target_sheet_id).worksheet(target_tab_name)
+    target_sheet = gsheet_client.open_worksheet(target_sheet_id, target_tab_name)
 
     # Clear existing content in the range
     print("Clearing target sheet from A2:K...")
@@ -42,6 +59,13 @@ if data:
     target_sheet.update(values=data, range_name="A2")  # Write clean data
 
     print("Data successfully transferred!")
+    watch.commit()
+
+
+# for runner.py
+JOBS = [Job("Collection_carinfo", main, reads=["Car Info"], writes=["Details"])]
+
 
-else:
-    print("No data found in A2:K.")
+if __name__ == "__main__":
+    with tracing.job("Collection_carinfo"):
+        main()
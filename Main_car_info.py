@@ -1,72 +1,117 @@
 import os
-import json
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime
+import archive
+import gsheet_client
+import tracing
+from change_detect import SourceWatch
+from pipeline import Job
+from row_spec import NotEmpty, RowSpec
+from sheet_sync import keyed_sync, sync_mode
+from table import Table
 
-def import_car_data():
-    SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+# "upsert" = insert / update / delete only the rows whose key changed, "full" = clear + rewrite
+SYNC_MODE = sync_mode("CAR_INFO_SYNC_MODE", "upsert", ("upsert", "full"))
+# Info Data key: partner_etm, optionally with loc_id ("partner_etm,loc_id")
+KEY_INDEX = {"loc_id": 0, "partner_etm": 1}
+UPSERT_KEY = [k.strip().lower() for k in os.environ.get("CAR_INFO_UPSERT_KEY", "partner_etm").split(",")]
+if set(UPSERT_KEY) - set(KEY_INDEX):
+    raise ValueError(f"CAR_INFO_UPSERT_KEY={','.join(UPSERT_KEY)!r}: expected column names from {', '.join(KEY_INDEX)}")
+KEY_COLUMNS = [KEY_INDEX[k] for k in UPSERT_KEY]
 
-    # Read service account JSON from env
-    key_data = os.environ.get("ACCOUNT_KEY_JSON")
-    if not key_data:
-        raise Exception("ACCOUNT_KEY_JSON environment variable not found")
+# output column -> source column
+CAR_INFO_COLUMNS = [
+    "B",  # loc_id
+    "C",  # partner_etm
+    "F",  # start_date
+    "G",  # end_date
+    "H",  # allocation_date
+    "I",  # car_type
+    "J",  # business_vertical
+    "L",  # extra col
+]
 
-    creds_dict = json.loads(key_data)
-    creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-    client = gspread.authorize(creds)
+# rows come back already in output order; keep the ones with a partner_etm
+# (the EV tab has a header row to drop first)
+CAR_INFO_SPECS = {
+    "Car Info from CNG": RowSpec(CAR_INFO_COLUMNS, where=[NotEmpty(1)]).compile(),
+    "Car Info from EV": RowSpec(CAR_INFO_COLUMNS, skip=1, where=[NotEmpty(1)]).compile(),
+}
 
+def import_car_data():
     # Sheet details
     source_spreadsheet_id = "1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU"
-    source_sheet_names = ["Car Info from CNG", "Car Info from EV"]
+    source_sheet_names = list(CAR_INFO_SPECS)
 
     target_spreadsheet_id = "1LYtmHJ3NOGs0Likkl7_eIfemX-g9kVGhfIN1FzMGBh4"
     target_sheet_name = "Info Data"
     last_run_sheet_name = "Last Script Run"
 
-    all_processed_data = []
+    tracing.phase("fetch")
+    watch = SourceWatch("import_car_data", [source_spreadsheet_id])
+    replay = archive.replay_date()
+    if replay is None and watch.skip_read():
+        stamp_last_run(target_spreadsheet_id, last_run_sheet_name)
+        return
+
+    if replay:
+        print(f"ℹ️ Reading Car Info tabs as archived on {replay}")
+        source_data = [archive.load(name, replay) for name in source_sheet_names]
+    else:
+        # Only the used columns of both source tabs, in one batchGet
+        source_data = gsheet_client.batch_get_columns(
+            [CAR_INFO_SPECS[name].spec.request(source_spreadsheet_id, name) for name in source_sheet_names]
+        )
+        for name, data in zip(source_sheet_names, source_data):
+            archive.save(name, data)
 
-    for sheet_name in source_sheet_names:
-        source = client.open_by_key(source_spreadsheet_id).worksheet(sheet_name)
-        data = source.get("B:L")
+    tracing.phase("transform")
+    kept = [CAR_INFO_SPECS[name].apply(data) for name, data in zip(source_sheet_names, source_data)]
+    all_processed_data = Table.concat(kept)
 
-        # EV sheet header skip
-        if sheet_name == "Car Info from EV" and len(data) > 1:
-            data = data[1:]
+    tracing.phase("write")
+    if watch.skip_write(all_processed_data):
+        watch.commit()
+        stamp_last_run(target_spreadsheet_id, last_run_sheet_name)
+        return
 
-        for row in data:
-            if len(row) > 1 and row[1]:
-                all_processed_data.append([
-                    row[0],                             # loc_id
-                    row[1],                             # partner_etm
-                    row[4] if len(row) > 4 else "",     # start_date
-                    row[5] if len(row) > 5 else "",     # end_date
-                    row[6] if len(row) > 6 else "",     # allocation_date
-                    row[7] if len(row) > 7 else "",     # car_type
-                    row[8] if len(row) > 8 else "",     # business_vertical
-                    row[10] if len(row) > 10 else "",   # extra col
-                ])
+    target = gsheet_client.open_worksheet(target_spreadsheet_id, target_sheet_name)
 
-    target = client.open_by_key(target_spreadsheet_id).worksheet(target_sheet_name)
-    target.batch_clear(["A:H"])
+    if SYNC_MODE == "full":
+        target.batch_clear(["A:H"])
+        if all_processed_data:
+            target.update("A1", all_processed_data.to_rows(), value_input_option="USER_ENTERED")
+        print(f"✅ Imported {len(all_processed_data)} rows successfully")
+    else:
+        stats = keyed_sync(
+            target, all_processed_data, width=len(CAR_INFO_COLUMNS),
+            key_columns=KEY_COLUMNS, start_row=1,
+        )
+        print(f"✅ Upserted {len(all_processed_data)} rows: {stats['inserted']} inserted, "
+              f"{stats['deleted']} deleted, {stats['changed']} rows written")
 
-    if all_processed_data:
-        target.update("A1", all_processed_data, value_input_option="USER_ENTERED")
+    watch.commit()
+    stamp_last_run(target_spreadsheet_id, last_run_sheet_name)
 
+def stamp_last_run(spreadsheet_id, sheet_name):
     # Update last run time
     try:
-        last_run = client.open_by_key(target_spreadsheet_id).worksheet(last_run_sheet_name)
+        last_run = gsheet_client.open_worksheet(spreadsheet_id, sheet_name)
         last_run.clear()
     except:
-        last_run = client.open_by_key(target_spreadsheet_id)\
-            .add_worksheet(last_run_sheet_name, rows=5, cols=2)
+        last_run = gsheet_client.open_spreadsheet(spreadsheet_id)\
+            .add_worksheet(sheet_name, rows=5, cols=2)
 
     last_run.update(
         "A1",
         [["Last Script Run Time", datetime.now().strftime("%Y-%m-%d %H:%M:%S")]]
     )
 
-    print(f"✅ Imported {len(all_processed_data)} rows successfully")
+# for runner.py
+JOBS = [
+    Job("import_car_data", import_car_data,
+        reads=["Car Info from CNG", "Car Info from EV"], writes=["Info Data", "Last Script Run"]),
+]
 
 if __name__ == "__main__":
-    import_car_data()
+    with tracing.job("import_car_data"):
+        import_car_data()
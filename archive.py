@@ -0,0 +1,297 @@
+"""
+Local, append-only snapshots of the source tabs the jobs fetch.
+
+Every save writes one new file under
+
+    ARCHIVE_DIR/<tab>/date=YYYY-MM-DD/<HHMMSSffffff>.parquet
+
+(.json.gz with the same column layout when pyarrow is not installed).
+Partitions older than ARCHIVE_KEEP_DAYS are pruned. Jobs only fetch when
+SourceWatch saw a change, so unchanged tabs are not archived twice.
+
+Set ARCHIVE_DATE=YYYY-MM-DD to make the jobs read that day's snapshot from disk
+instead of calling the API (backfills, reruns for a past date). ARCHIVE=0 turns
+saving off.
+
+In GitHub Actions the archive lives on the `sheet-archive` branch (ARCHIVE_BRANCH)
+so every workflow sees the same snapshots:
+
+    python archive.py checkout   # before the jobs: branch -> ARCHIVE_DIR (git worktree)
+    python archive.py publish    # after them: ARCHIVE_DIR -> branch
+
+checkout fetches the tip without blobs and checks out only today's and
+ARCHIVE_DATE's partitions; publish adds the new snapshots onto the tip's index.
+A run therefore downloads what it reads, however big the archive grows. Both
+commands only warn on failure: the jobs never depend on them.
+
+Retention: the branch is always ONE commit holding the last ARCHIVE_KEEP_DAYS
+days; publish replaces it (force-with-lease, merging snapshots pushed in the
+meantime) and drops expired partitions, so neither history nor the repo grows
+beyond that window. At about 1-2 MB of Parquet per OS_ETM_Summary fetch, 7 runs
+a day and 90 days, expect the tip to stay around 1 GB; lower ARCHIVE_KEEP_DAYS
+if that is too much.
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import subprocess
+from datetime import date, datetime, timedelta, timezone
+
+from table import Table
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: fall back to gzipped JSON columns
+    pa = pq = None
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", ".archive")
+ARCHIVE_ENABLED = os.environ.get("ARCHIVE", "1") != "0"
+ARCHIVE_KEEP_DAYS = int(os.environ.get("ARCHIVE_KEEP_DAYS", "90"))
+ARCHIVE_BRANCH = os.environ.get("ARCHIVE_BRANCH", "sheet-archive")
+PUBLISH_ATTEMPTS = 5
+
+
+def replay_date():
+    """The ARCHIVE_DATE the jobs should read from disk, or None for a live run."""
+    value = os.environ.get("ARCHIVE_DATE")
+    return date.fromisoformat(value) if value else None
+
+
+def _safe(tab):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in tab)
+
+
+def _partition(tab, day):
+    return os.path.join(ARCHIVE_DIR, _safe(tab), f"date={day.isoformat()}")
+
+
+def _snapshots(tab, day):
+    folder = _partition(tab, day)
+    try:
+        return sorted(os.path.join(folder, f) for f in os.listdir(folder) if not f.endswith(".tmp"))
+    except FileNotFoundError:
+        return []
+
+
+# ===== FORMATS =====
+def _write_parquet(path, table):
+    # one field per column; columns Sheets returns with mixed types (a text header
+    # above numbers, blanks between numbers) are stored as JSON text and flagged
+    arrays, fields = [], []
+    for p in range(table.width):
+        values = table.column(p)
+        try:
+            array = pa.array(values)
+            encoded = False
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            array = pa.array([json.dumps(v, default=str) for v in values], type=pa.string())
+            encoded = True
+        arrays.append(array)
+        fields.append(pa.field(f"c{p}", array.type, metadata={"json": "1"} if encoded else None))
+    pq.write_table(pa.Table.from_arrays(arrays, schema=pa.schema(fields)), path)
+
+
+def _read_parquet(path):
+    data = pq.read_table(path)
+    columns = []
+    for field, column in zip(data.schema, data.columns):
+        values = column.to_pylist()
+        if field.metadata and field.metadata.get(b"json") == b"1":
+            values = [json.loads(v) for v in values]
+        columns.append(values)
+    return Table(columns)
+
+
+def _write_json(path, table):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"columns": [table.column(p) for p in range(table.width)]}, f, default=str)
+
+
+def _read_json(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return Table(json.load(f)["columns"])
+
+
+# ===== API =====
+def save(tab, data, when=None):
+    """
+    Appends `data` (Table or rows) as a snapshot of `tab`; returns the file
+    written, or None. Never raises: a full disk must not fail the job.
+    """
+    if not ARCHIVE_ENABLED:
+        return None
+    try:
+        when = when or datetime.now(timezone.utc)
+        table = Table.of(data)
+        folder = _partition(tab, when.date())
+        os.makedirs(folder, exist_ok=True)
+        ext = "parquet" if pq else "json.gz"
+        path = os.path.join(folder, f"{when:%H%M%S%f}.{ext}")
+        tmp = f"{path}.tmp"
+        (_write_parquet if pq else _write_json)(tmp, table)
+        os.replace(tmp, path)
+
+        prune(tab, when.date())
+        return path
+    except Exception as e:
+        print(f"⚠️ archive: could not save {tab} ({e})")
+        return None
+
+
+def load(tab, day):
+    """Latest snapshot of `tab` taken on `day`, as a Table."""
+    snapshots = _snapshots(tab, day)
+    if not snapshots:
+        raise FileNotFoundError(f"no archived snapshot of {tab!r} for {day.isoformat()} in {ARCHIVE_DIR}")
+    path = snapshots[-1]
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError(f"{path} needs pyarrow")
+        return _read_parquet(path)
+    return _read_json(path)
+
+
+def partitions(tab):
+    """Dates that have at least one snapshot of `tab`, oldest first."""
+    try:
+        names = os.listdir(os.path.join(ARCHIVE_DIR, _safe(tab)))
+    except FileNotFoundError:
+        return []
+    return sorted(date.fromisoformat(n[5:]) for n in names if n.startswith("date="))
+
+
+def prune(tab, today):
+    if ARCHIVE_KEEP_DAYS <= 0:
+        return
+    cutoff = today - timedelta(days=ARCHIVE_KEEP_DAYS)
+    for day in partitions(tab):
+        if day < cutoff:
+            shutil.rmtree(_partition(tab, day), ignore_errors=True)
+
+
+# ===== BRANCH STORAGE =====
+def _git(*args, cwd=None, check=True):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if check and result.returncode:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result
+
+
+def _remote_tip():
+    out = _git("ls-remote", "origin", f"refs/heads/{ARCHIVE_BRANCH}").stdout.split()
+    return out[0] if out else None
+
+
+def _partitions_wanted():
+    """Dates a run reads or writes: today (UTC) and ARCHIVE_DATE."""
+    days = {datetime.now(timezone.utc).date()}
+    if replay_date():
+        days.add(replay_date())
+    return sorted(days)
+
+
+def _is_worktree():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return False
+    top = _git("rev-parse", "--show-toplevel", cwd=ARCHIVE_DIR, check=False).stdout.strip()
+    return bool(top) and os.path.samefile(top, ARCHIVE_DIR)
+
+
+def checkout():
+    """
+    ARCHIVE_DIR as a worktree of the archive branch (an empty one if the branch
+    does not exist yet). Only the tip's trees are fetched (blob:none) and only
+    the partitions of _partitions_wanted() are checked out, so a run downloads
+    today's / ARCHIVE_DATE's snapshots, not the whole retention window.
+    """
+    tip = _remote_tip()
+    if tip:
+        _git("fetch", "--filter=blob:none", "--depth=1", "origin", tip)
+        _git("worktree", "add", "--no-checkout", "--detach", ARCHIVE_DIR, tip)
+        patterns = [f"/*/date={day.isoformat()}/" for day in _partitions_wanted()]
+        _git("sparse-checkout", "set", "--no-cone", *patterns, cwd=ARCHIVE_DIR)
+        _git("checkout", "-q", cwd=ARCHIVE_DIR)  # fetches the blobs of those partitions only
+        print(f"📦 Archive: {ARCHIVE_BRANCH} @ {tip[:8]} checked out in {ARCHIVE_DIR} "
+              f"({', '.join(d.isoformat() for d in _partitions_wanted())})")
+    else:
+        _git("worktree", "add", "--detach", ARCHIVE_DIR, "HEAD")
+        _git("checkout", "-q", "--orphan", f"{ARCHIVE_BRANCH}-local", cwd=ARCHIVE_DIR)  # unborn HEAD = no tip
+        _git("rm", "-rfq", "--ignore-unmatch", ".", cwd=ARCHIVE_DIR)
+        print(f"📦 Archive: no {ARCHIVE_BRANCH} branch yet, starting empty")
+    return tip
+
+
+def _stage(tip):
+    """Index = `tip`'s tree + the snapshots saved by this run - partitions past ARCHIVE_KEEP_DAYS."""
+    if tip:
+        _git("read-tree", tip, cwd=ARCHIVE_DIR)  # trees only: no blob is downloaded
+    else:
+        _git("read-tree", "--empty", cwd=ARCHIVE_DIR)
+    # snapshot files are never rewritten: add what is on disk, never stage a removal
+    _git("add", "--sparse", "--ignore-removal", ".", cwd=ARCHIVE_DIR)
+    if ARCHIVE_KEEP_DAYS > 0:
+        cutoff = datetime.now(timezone.utc).date() - timedelta(days=ARCHIVE_KEEP_DAYS)
+        expired = sorted({
+            os.path.dirname(path)
+            for path in _git("ls-files", cwd=ARCHIVE_DIR).stdout.splitlines()
+            if _partition_day(path) and _partition_day(path) < cutoff
+        })
+        if expired:
+            _git("rm", "-rq", "--cached", "--sparse", "--", *expired, cwd=ARCHIVE_DIR)
+
+
+def _partition_day(path):
+    """date of a '<tab>/date=YYYY-MM-DD/<file>' path, None for anything else."""
+    parts = path.split("/")
+    if len(parts) != 3 or not parts[1].startswith("date="):
+        return None
+    try:
+        return date.fromisoformat(parts[1][5:])
+    except ValueError:
+        return None
+
+
+def publish():
+    """
+    Replaces the archive branch with one commit: the current tip plus the
+    snapshots this run saved, minus expired partitions. Works on the index
+    alone, so the tip's other blobs never have to be downloaded.
+    """
+    if not _is_worktree():
+        print(f"⚠️ Archive: {ARCHIVE_DIR} is not an archive checkout, nothing to publish")
+        return None
+    # the branch tip checkout() started from; none when the branch did not exist
+    tip = _git("rev-parse", "--verify", "-q", "HEAD", cwd=ARCHIVE_DIR, check=False).stdout.strip() or None
+    for attempt in range(1, PUBLISH_ATTEMPTS + 1):
+        _stage(tip)
+        tree = _git("write-tree", cwd=ARCHIVE_DIR).stdout.strip()
+        commit = _git(
+            "-c", "user.name=sheet-archive", "-c", "user.email=sheet-archive@users.noreply.github.com",
+            "commit-tree", tree, "-m", f"Sheet snapshots as of {datetime.now(timezone.utc):%Y-%m-%d %H:%M} UTC",
+            cwd=ARCHIVE_DIR,
+        ).stdout.strip()
+        lease = f"--force-with-lease=refs/heads/{ARCHIVE_BRANCH}:{tip or ''}"
+        if _git("push", lease, "origin", f"{commit}:refs/heads/{ARCHIVE_BRANCH}",
+                cwd=ARCHIVE_DIR, check=False).returncode == 0:
+            print(f"📦 Archive published to {ARCHIVE_BRANCH} ({commit[:8]})")
+            return commit
+        # another workflow published first: start again from its tip
+        tip = _remote_tip()
+        print(f"⏳ Archive branch moved, merging and retrying ({attempt}/{PUBLISH_ATTEMPTS})")
+        if tip:
+            _git("fetch", "--filter=blob:none", "--depth=1", "origin", tip, cwd=ARCHIVE_DIR)
+    raise RuntimeError(f"could not publish the archive to {ARCHIVE_BRANCH}")
+
+
+if __name__ == "__main__":
+    commands = {"checkout": checkout, "publish": publish}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        raise SystemExit(f"usage: python archive.py {{{'|'.join(commands)}}}")
+    try:
+        commands[sys.argv[1]]()
+    except Exception as e:
+        # the archive is a side copy: a git / network hiccup must not stop (or fail) the jobs
+        print(f"⚠️ Archive {sys.argv[1]} failed, the jobs run without it: {e}")
@@ -0,0 +1,104 @@
+"""
+Asyncio transport for Sheets v4 reads (values:batchGet) and other blocking calls.
+
+gspread is synchronous, so a job that reads one spreadsheet and opens / writes
+another makes those calls one after another. AsyncSheets turns each call into an
+awaitable that runs on the shared, pooled HTTP client (keep-alive session, quota
+pacing and retries from quota.py) through asyncio.to_thread, so independent calls
+to different spreadsheets overlap. `run()` is the synchronous facade the job
+functions use:
+
+    sheets = async_sheets.default()
+    data, target = async_sheets.run(
+        sheets.get(SOURCE_ID, "OS_ETM_Summary", "A:Q"),
+        sheets.call(gsheet_client.open_worksheet, TARGET_ID, "OS_Collection"),
+    )
+
+Writes stay on the jobs' WritePlans: each one depends on the read before it,
+and a target is cleared in the same batchUpdate that rewrites it (never while
+the source is still being fetched), so there is no write to overlap.
+
+`set_default()` swaps in another transport, e.g. one pointed at the local
+stand-in from fake_gsheet.serve().
+"""
+import os
+import asyncio
+import threading
+
+from gspread.utils import absolute_range_name
+
+import gsheet_client
+import tracing
+
+SHEETS_API = os.environ.get("SHEETS_API_URL", "https://sheets.googleapis.com/v4/spreadsheets")
+
+_lock = threading.Lock()
+_default = None
+
+
+class AsyncSheets:
+    def __init__(self, http=None, base_url=SHEETS_API):
+        """
+        `http` is anything with gspread's HTTPClient.request(method, url, params=,
+        json=) signature; None = the shared client's, looked up on every call so
+        gsheet_client.set_client() applies.
+        """
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+
+    async def call(self, func, *args, **kwargs):
+        """Any blocking call (a gspread handle, a WritePlan) on the worker pool, traced as the caller's job / phase."""
+        return await asyncio.to_thread(tracing.carry(func), *args, **kwargs)
+
+    async def _request(self, method, path, params=None, body=None):
+        http = self.http or gsheet_client.get_client().http_client
+        response = await self.call(http.request, method, f"{self.base_url}/{path}", params=params, json=body)
+        return response.json()
+
+    # ----- values -----
+    async def values_batch_get(self, spreadsheet_id, ranges, value_render_option=None, major_dimension=None):
+        params = {"ranges": list(ranges)}
+        if value_render_option:
+            params["valueRenderOption"] = value_render_option
+        if major_dimension:
+            params["majorDimension"] = major_dimension
+        return await self._request("get", f"{spreadsheet_id}/values:batchGet", params=params)
+
+    async def get(self, spreadsheet_id, tab, range_name, value_render_option="UNFORMATTED_VALUE"):
+        """Values of one range, row-major, trailing blanks trimmed like Worksheet.get()."""
+        response = await self.values_batch_get(
+            spreadsheet_id, [absolute_range_name(tab, range_name)], value_render_option
+        )
+        value_ranges = response.get("valueRanges", [])
+        return value_ranges[0].get("values", []) if value_ranges else []
+
+
+def default():
+    """The process-wide transport (created on first use)."""
+    global _default
+    with _lock:
+        if _default is None:
+            _default = AsyncSheets()
+        return _default
+
+
+def set_default(transport):
+    """Swap in another transport (e.g. one pointed at a local stand-in); None resets."""
+    global _default
+    with _lock:
+        _default = transport
+
+
+def run(*calls):
+    """
+    Synchronous facade: awaits the given coroutines side by side and returns
+    their results in order. The first exception is raised once all have finished.
+    """
+    async def gather():
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    return asyncio.run(gather())
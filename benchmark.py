@@ -0,0 +1,527 @@
+"""
+Offline benchmarks for the sheet jobs, run against the in-memory fake in fake_gsheet.
+
+    python benchmark.py                          # job suite + transform micro-benchmark
+    python benchmark.py --scale 0.1 --latency 0.05
+    python benchmark.py --scale 0.2 --save bench_baseline.json
+    python benchmark.py --scale 0.2 --check bench_baseline.json   # exit 1 on a regression
+
+Per job it reports wall time, API calls, cells read / written and peak Python
+memory (tracemalloc). Call and cell counts are deterministic for a given scale,
+so --check compares them exactly; wall time is only reported.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone
+
+import pandas  # noqa: F401 — imported once here so no job's numbers include it
+import archive
+import gsheet_client
+import state_store
+from fake_gsheet import FakeClient
+from All_collection_recovery import OS_COLLECTION_COLUMNS, transform_cng_os
+from row_spec import number as to_number
+from sheet_sync import project_rows
+
+CITIES = ["Delhi NCR", "Gurgaon", "Noida", "Faridabad", "Ghaziabad", "Sukhrali"]
+
+
+# ===== SYNTHETIC DATA =====
+def make_os_collection(rows, days=60, seed=7):
+    """OS_Collection-shaped rows as get_all_values() returns them (all strings, header first)."""
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    data = [[f"Col{i}" for i in range(20)]]
+    for i in range(rows):
+        d = start + timedelta(days=rng.randrange(days))
+        row = [
+            d.strftime("%d/%m/%Y"),
+            rng.choice(CITIES),
+            f"ETM{rng.randrange(5000):05d}",
+            f"DL{rng.randrange(10**6):06d}",
+            f"{rng.uniform(0, 50000):,.2f}",
+            f"Driver {i}",
+        ]
+        row += [str(rng.randrange(100)) for _ in range(4)]
+        row += [f"{rng.uniform(-9999, 9999):,.3f}"]
+        row += ["" for _ in range(6)]
+        row += [f"{rng.uniform(0, 5000):.2f}", "", "n/a" if i % 97 == 0 else f"{rng.random():.4f}"]
+        if i % 500 == 0:
+            row[0] = "31/02/2025"  # bad date -> reported + skipped
+        data.append(row[: rng.choice([20, 20, 20, 18])])  # some ragged rows
+    return data
+
+
+def _money(rng, hi):
+    return round(rng.uniform(0, hi), 2)
+
+
+def make_dataset(scale=1.0, seed=11):
+    """
+    {spreadsheet_id: {tab: rows}} shaped like production. scale=1.0 gives
+    50k OS_ETM_Summary rows and 20k x 38-column Combined CNG rows.
+    """
+    rng = random.Random(seed)
+    n = lambda x: max(1, int(x * scale))
+    day = lambda: (date(2025, 1, 1) + timedelta(days=rng.randrange(30))).strftime("%d/%m/%Y")
+    cities = CITIES + ["Delhi", "Mumbai", "Pune"]
+
+    os_summary = [["OS ETM Summary"], ["generated"], [f"H{c}" for c in range(17)]]
+    for i in range(n(50_000)):
+        os_summary.append(
+            [day(), rng.choice(cities), f"ETM{i % 4000:05d}", f"DL{i:06d}", _money(rng, 50000), f"Driver {i}"]
+            + [rng.randrange(100) for _ in range(4)] + [_money(rng, 9999)]
+            + [rng.choice(["", "x"]) for _ in range(6)]
+        )
+
+    os_summary[3:] = sorted(os_summary[3:], key=lambda r: datetime.strptime(r[0], "%d/%m/%Y"))  # appended day by day
+
+    leasing = [["L" + str(c) for c in range(7)]] + [
+        [f"DL{i:06d}", day(), _money(rng, 9000), "", "", rng.randrange(30), "Leasing"] for i in range(n(5_000))
+    ]
+    revshare = [["R" + str(c) for c in range(8)]] + [
+        ["" if i % 10 == 0 else f"DL{i:06d}", day(), "drop", _money(rng, 9000), "", "", rng.randrange(30), "Revshare"]
+        for i in range(n(5_000))
+    ]
+
+    car_info = lambda prefix: [
+        [f"LOC{i % 50}", f"{prefix}{i:05d}" if i % 25 else "", "", "", day(), day(), day(),
+         rng.choice(["CNG", "EV"]), "B2C", "", rng.choice(["A", "B"])]
+        for i in range(n(3_000))
+    ]
+    ev = [["loc", "partner_etm"]] + car_info("EV")
+    cng = [[""] + row for row in car_info("CNG")]  # get("B:L") starts at column B
+    ev = [[""] + row for row in ev]
+
+    combined = [[f"C{c}" for c in range(38)]] + [
+        [f"ETM{i:05d}", day(), rng.choice(cities)] + [_money(rng, 1000) for _ in range(35)]
+        for i in range(n(20_000))
+    ]
+    details = [["h" + str(c) for c in range(11)]] + [
+        [f"LOC{i % 50}", f"CNG{i:05d}", day(), "", "", "", "", "CNG", "B2C", "", "A"] for i in range(n(6_000))
+    ]
+
+    def leads(rows, width, city_col=2):
+        out = [[f"{width}h{c}" for c in range(width)]]
+        for i in range(n(rows)):
+            row = [f"L{i:06d}", day(), rng.choice(cities), rng.choice(cities)] + [
+                rng.choice([_money(rng, 500), f"v{i}", ""]) for _ in range(width - 4)
+            ]
+            row[city_col] = rng.choice(["Delhi NCR", " delhi ncr ", "Mumbai", "Pune"])
+            out.append(row[: rng.choice([width, width, width - 3])])
+        return out
+
+    new_joining = [["city"] + [f"j{c}" for c in range(24)]] + [
+        [rng.choice(["Delhi NCR", "Pune"]), f"J{i:05d}", day()] + [f"x{c}" for c in range(22)] for i in range(n(2_000))
+    ]
+    allocation_dest = {
+        tab: [["stale"] * 10 for _ in range(n(500))]
+        for tab in ("FSE", "Exception_File", "Vendor", "Telecalling", "Rejoin")  # "Referal" is created
+    }
+    allocation_dest["New Joining"] = [[""] * 20 + [f"note{i}"] for i in range(n(800))]
+
+    return {
+        "1z1EsD9S4yIjn3MNAAjvdsApw3T6R-K8KuJf2s1rnkgE": {
+            "raw_leads": leads(8_000, 29), "Exception_File": leads(1_000, 19),
+        },
+        "1AYOZnHLQBi7GIqn1PdTNNRko5gwtngJZZhB_UCHPQPo": {"raw_leads": leads(8_000, 29)},
+        "1fcHmuexLkj_Rjxai38aSewk76lcls-O9EDR1VGPul5w": {"New Joins": leads(2_000, 17)},
+        "1MHG10SDEYoeBfq512t_rkBb7lpUvBD3XNRCLUrv0MCc": {"Raw_Data": leads(3_000, 29, city_col=3)},
+        "1jmqNQt1VIKCAFCg9qBhkeYr1zrNg54Q-9c1PHY_bb5w": {"Rejoinings": leads(1_000, 16)},
+        "1o6nrw8zgg48q1Qbn01J23M8ePYel9IraqXCcuUPMwlM": {"Raw Data": new_joining},
+        "1HGkBcL4mxgrTs5wNhWz9OgALIE-2pMoZ_P8P2vCsIls": allocation_dest,
+        "1D4LjhxfaBpV1zUSCrQ7Xfe2NpeNRNgSdli16lh4anlo": {
+            "OS_ETM_Summary": os_summary, "Leasing_Raw": leasing, "Revshare_Raw": revshare,
+        },
+        "1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw": {"OS_Collection": [], "Recovery": []},
+        "1HMlQzPbqpEh2OiIZT6h5UxjfY-wmWUrLQDgahNsxzl0": {
+            "CNG_OS_Summary": [["", "", "", "", "15/01/2025"], [""] * 14]
+            + [[""] * 4 + [f"old{i}"] * 10 for i in range(n(2_000))],
+            "Details": [],
+        },
+        "1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU": {
+            "Car Info from CNG": cng, "Car Info from EV": ev, "Combined CNG": combined,
+        },
+        "1LYtmHJ3NOGs0Likkl7_eIfemX-g9kVGhfIN1FzMGBh4": {
+            "Info Data": [], "Last Script Run": [], "Car Info": details,
+        },
+        "1fS8creQX5JyxMVeSQmsRzd0Tfm4j4m8-mZW6l6Athc4": {"Combined": []},
+    }
+
+
+# ===== BASELINES =====
+def transform_cng_os_loop(data, filter_date):
+    """The original per-row implementation, kept as the reference for output + timing."""
+    output = []
+    for s in data[1:]:
+        s = s + [""] * 21
+        try:
+            if not s[0]:
+                continue
+            row_date = datetime.strptime(s[0], "%d/%m/%Y").date()
+            if row_date == filter_date and s[1].strip() != "Delhi NCR":
+                output.append([
+                    s[3], s[0], s[1], s[2], s[5],
+                    to_number(s[4]), to_number(s[10]), to_number(s[17]),
+                    to_number(s[18]), to_number(s[19]),
+                ])
+        except Exception as e:
+            print(f"⚠️ Skipping row due to error: {e}")
+    return output
+
+
+def _timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+# ===== BENCHMARKS =====
+def bench_cng_os_transform(rows=120_000):
+    data = make_os_collection(rows)
+    projected = project_rows(data, OS_COLLECTION_COLUMNS)  # what batch_get_columns hands the job
+    filter_date = date(2025, 1, 15)
+
+    # capture the per-row skip lines: they must match too
+    with redirect_stdout(io.StringIO()) as loop_log:
+        loop_s, expected = _timed(transform_cng_os_loop, data, filter_date)
+    with redirect_stdout(io.StringIO()) as fast_log:
+        fast_s, got = _timed(transform_cng_os, projected, filter_date)
+
+    if got != expected:
+        raise AssertionError("❌ transform_cng_os output differs from the row loop")
+    if fast_log.getvalue() != loop_log.getvalue():
+        raise AssertionError("❌ transform_cng_os error report differs from the row loop")
+
+    print(f"importCNGOSCollectionFast transform | {rows:,} rows -> {len(got):,} kept")
+    print(f"  row loop : {loop_s * 1000:8.1f} ms")
+    print(f"  columnar : {fast_s * 1000:8.1f} ms  ({loop_s / fast_s:.1f}x)")
+    return {"rows": rows, "loop_seconds": loop_s, "columnar_seconds": fast_s}
+
+
+def _script(path):
+    def run():
+        try:
+            runpy.run_path(path, run_name="__main__")
+        except SystemExit:
+            pass
+    return run
+
+
+def _job(module, func):
+    def run():
+        mod = __import__(module)
+        getattr(mod, func)()
+    return run
+
+
+def _with_env(run, **env):
+    def wrapped():
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+        try:
+            run()
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+    return wrapped
+
+
+def _cng_indexed():
+    """importCNGOSCollectionFast with the OS_Collection date index ossummarycollection leaves behind."""
+    import All_collection_recovery as acr
+    rows = gsheet_client.get_client().spreadsheets["1sipU5ThP9PmJYBBn06XxGZkPvUNobBCHQWo8jNwUyuw"].tabs["OS_Collection"].values
+    state_store.default_store().set(acr.OS_COLLECTION_INDEX, acr.build_date_index(rows[1:], first_row=2))
+    acr.importCNGOSCollectionFast()
+
+
+def _car_info_churn():
+    """import_car_data again after a day's worth of source edits; runs after the first import."""
+    import Main_car_info
+    tabs = gsheet_client.get_client().spreadsheets["1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU"].tabs
+    cng = tabs["Car Info from CNG"].values
+    for row in cng[::40]:
+        row[8] = "EV" if row[8] == "CNG" else "CNG"  # car_type change -> update
+    del cng[100:110]                                 # returned cars -> delete
+    cng.extend([["", "LOC9", f"NEW{i:04d}", "", "", "01/01/2025", "", "", "CNG", "B2C", "", "A"] for i in range(15)])
+    Main_car_info.import_car_data()
+
+
+def _over_http(run):
+    """`run` with async_sheets talking real HTTP to a local stand-in of the Sheets API."""
+    def wrapped():
+        import requests
+        import async_sheets
+        from fake_gsheet import serve
+        from quota import QuotaHTTPClient
+        server, base_url = serve(gsheet_client.get_client())
+        async_sheets.set_default(async_sheets.AsyncSheets(QuotaHTTPClient(None, requests.Session()), base_url))
+        try:
+            run()
+        finally:
+            async_sheets.set_default(None)
+            server.shutdown()
+            server.server_close()
+    return wrapped
+
+
+def _tab(client, spreadsheet_id, tab):
+    """A fake tab's cells as the API returns them: trailing blanks and trailing empty rows dropped."""
+    rows = []
+    for row in client.spreadsheets[spreadsheet_id].tabs[tab].values:
+        row = list(row)
+        while row and row[-1] in ("", None):
+            row.pop()
+        rows.append(row)
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def _steady(edit, run, full, spreadsheet_id, tab, ordered=True):
+    """
+    `edit` the source tabs, sync them again with `run` and check the target tab
+    against what `full` (the job's clear + rewrite mode) leaves on a copy of the
+    workbook. The copy has its own counters and sync state, so only `run` is
+    measured. `ordered=False` compares the rows as a multiset (a keyed upsert
+    keeps rows where they were instead of in source order).
+    """
+    def wrapped():
+        client = gsheet_client.get_client()
+        edit(client.spreadsheets)
+        copy = FakeClient({
+            sid: {name: [list(r) for r in ws.values] for name, ws in spreadsheet.tabs.items()}
+            for sid, spreadsheet in client.spreadsheets.items()
+        })
+        store = state_store.default_store()
+        state_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False).name
+        os.unlink(state_file)
+        gsheet_client.set_client(copy)
+        state_store.set_default_store(state_store.FileStateStore(state_file))
+        try:
+            full()
+        finally:
+            gsheet_client.set_client(client)
+            state_store.set_default_store(store)
+            if os.path.exists(state_file):
+                os.unlink(state_file)
+
+        run()
+        expected, got = _tab(copy, spreadsheet_id, tab), _tab(client, spreadsheet_id, tab)
+        if not ordered:
+            expected, got = sorted(map(repr, expected)), sorted(map(repr, got))
+        if got != expected:
+            raise AssertionError(f"❌ {tab}: {len(got):,} rows after the sync, "
+                                 f"{len(expected):,} after a full rewrite, and they differ")
+    return wrapped
+
+
+def _edit_combined(spreadsheets):
+    """A day of Combined CNG edits: changed amounts, removed rows, new rows."""
+    tab = spreadsheets["1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU"].tabs["Combined CNG"]
+    rows = tab.values
+    for row in rows[1::60]:
+        row[5] = round(row[5] + 1.5, 2) if isinstance(row[5], float) else 1.5
+    del rows[200:215]
+    rows.extend([[f"ETM9{i:04d}", "02/01/2025", "Pune"] + [float(i)] * 35 for i in range(20)])
+    tab.row_count = max(tab.row_count, len(rows))  # rows typed in below the grid grow it
+
+
+def _edit_car_info(spreadsheets):
+    """Car type flips, returned cars and new cars on the CNG Car Info tab."""
+    tab = spreadsheets["1yDoXBuatVAep4z47L-WbSYvEELKZ3VOJm1CWwSQdWkU"].tabs["Car Info from CNG"]
+    rows = tab.values
+    for row in rows[5::35]:
+        row[8] = "EV" if row[8] == "CNG" else "CNG"
+    del rows[50:58]
+    rows.extend([["", "LOC7", f"NEW9{i:03d}", "", "", "02/01/2025", "", "", "EV", "B2C", "", "B"] for i in range(12)])
+    tab.row_count = max(tab.row_count, len(rows))
+
+
+def _car_info_full():
+    import Main_car_info
+    mode, Main_car_info.SYNC_MODE = Main_car_info.SYNC_MODE, "full"
+    try:
+        Main_car_info.import_car_data()
+    finally:
+        Main_car_info.SYNC_MODE = mode
+
+
+def _pipeline():
+    import All_collection_recovery
+    from pipeline import run_jobs
+    run_jobs(All_collection_recovery.JOBS)
+
+
+def _runner(*argv):
+    def run():
+        import runner
+        runner.main(list(argv))
+    return run
+
+
+# in pipeline order: importCNGOSCollectionFast reads what ossummarycollection wrote
+SUITE = [
+    ("ossummarycollection", _job("All_collection_recovery", "ossummarycollection")),
+    ("updateRecovery", _job("All_collection_recovery", "updateRecovery")),
+    ("ossummarycollection http", _over_http(_job("All_collection_recovery", "ossummarycollection"))),
+    ("importCNGOSCollectionFast", _job("All_collection_recovery", "importCNGOSCollectionFast")),
+    ("importCNGOSCollection indexed", _cng_indexed),
+    ("import_car_data", _job("Main_car_info", "import_car_data")),
+    ("import_car_data upsert", _car_info_churn),
+    # the same jobs fed from the snapshots the runs above archived
+    ("updateRecovery archived", _with_env(_job("All_collection_recovery", "updateRecovery"),
+                                          ARCHIVE_DATE=datetime.now(timezone.utc).date().isoformat())),
+    ("import_car_data archived", _with_env(_job("Main_car_info", "import_car_data"),
+                                           ARCHIVE_DATE=datetime.now(timezone.utc).date().isoformat())),
+    ("Collection_carinfo", _script("Collection_carinfo.py")),
+    ("Allocation_deallocation", _script("Allocation_deallocation.py")),
+    ("Allocation_deallocation delta", _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="delta")),
+    ("All_allocation", _script("All_allocation.py")),
+    # windowed streaming copies of the two tab-to-tab jobs
+    ("Collection_carinfo stream", _with_env(_script("Collection_carinfo.py"), CARINFO_DETAILS_SYNC_MODE="stream", STREAM_WINDOW_ROWS="500")),
+    ("Allocation_deallocation stream", _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="stream", STREAM_WINDOW_ROWS="500")),
+    # the three recovery jobs again, scheduled together with in-memory handoff
+    ("All_collection_recovery pipeline", _pipeline),
+    # the 04:30 UTC jobs in one process
+    ("runner --group 0430", _runner("--group", "0430")),
+    # steady state: edit the source, sync again, and the target must match a full rewrite
+    ("Allocation_deallocation delta steady", _steady(
+        _edit_combined, _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="delta"),
+        _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="full"),
+        "1fS8creQX5JyxMVeSQmsRzd0Tfm4j4m8-mZW6l6Athc4", "Combined")),
+    ("Allocation_deallocation stream steady", _steady(
+        _edit_combined, _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="stream", STREAM_WINDOW_ROWS="500"),
+        _with_env(_script("Allocation_deallocation.py"), COMBINED_SYNC_MODE="full"),
+        "1fS8creQX5JyxMVeSQmsRzd0Tfm4j4m8-mZW6l6Athc4", "Combined")),
+    ("import_car_data upsert steady", _steady(
+        _edit_car_info, _job("Main_car_info", "import_car_data"), _car_info_full,
+        "1LYtmHJ3NOGs0Likkl7_eIfemX-g9kVGhfIN1FzMGBh4", "Info Data", ordered=False)),
+]
+
+
+def run_suite(scale=1.0, latency=0.0, quota=None, verbose=False):
+    client = FakeClient(make_dataset(scale), latency=latency, quota_per_minute=quota)
+    gsheet_client.set_client(client)
+    state_file = tempfile.NamedTemporaryFile(suffix=".json", delete=False).name
+    archive.ARCHIVE_DIR = tempfile.mkdtemp(prefix="archive-")
+
+    results = {}
+    try:
+        for name, run in SUITE:
+            # every entry starts with no sync state, so nothing is skipped as unchanged
+            if os.path.exists(state_file):
+                os.unlink(state_file)
+            state_store.set_default_store(state_store.FileStateStore(state_file))
+            client.backend.reset()
+            log = io.StringIO()
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            with redirect_stdout(log):
+                try:
+                    run()
+                except AssertionError:
+                    raise
+                except Exception as e:  # a job that raises is reported like one that printed ❌
+                    print(f"❌ {name} raised {type(e).__name__}: {e}")
+            wall = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            if verbose:
+                print(log.getvalue())
+            results[name] = dict(
+                client.backend.summary(),
+                wall_seconds=round(wall, 4),
+                peak_mb=round(peak / 2**20, 2),
+                ok="❌" not in log.getvalue(),
+            )
+    finally:
+        gsheet_client.set_client(None)
+        shutil.rmtree(archive.ARCHIVE_DIR, ignore_errors=True)
+        if os.path.exists(state_file):
+            os.unlink(state_file)
+    return results
+
+
+def print_suite(results):
+    print(f"{'job':38} {'wall s':>8} {'calls':>6} {'cells read':>11} {'cells written':>14} {'peak MB':>8}  ok")
+    for name, r in results.items():
+        print(f"{name:38} {r['wall_seconds']:8.3f} {r['api_calls']:6d} {r['cells_read']:11,d} "
+              f"{r['cells_written']:14,d} {r['peak_mb']:8.1f}  {'✅' if r['ok'] else '❌'}")
+
+
+def check_regressions(results, baseline):
+    """Calls / cells may only go down; a failing job is always a regression."""
+    problems = []
+    for name, r in results.items():
+        if not r["ok"]:
+            problems.append(f"{name}: job reported a failure")
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("api_calls", "cells_read", "cells_written"):
+            if r[key] > base[key]:
+                problems.append(f"{name}: {key} {base[key]:,} -> {r[key]:,}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size, 1.0 = production-like")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake API call")
+    parser.add_argument("--quota", type=int, default=None, help="fake per-minute call quota (429 beyond it)")
+    parser.add_argument("--transform-rows", type=int, default=120_000)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--save", help="write call / cell counts as a new baseline")
+    parser.add_argument("--check", help="compare against a saved baseline, exit 1 on regression")
+    parser.add_argument("--verbose", action="store_true", help="show the jobs' own output")
+    args = parser.parse_args()
+
+    suite = run_suite(args.scale, args.latency, args.quota, args.verbose)
+    print_suite(suite)
+    print()
+    report = {"scale": args.scale, "jobs": suite}
+    if args.transform_rows:
+        report["transform"] = bench_cng_os_transform(args.transform_rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save:
+        keys = ("api_calls", "cells_read", "cells_written")
+        with open(args.save, "w", encoding="utf-8") as f:
+            baseline = {n: {k: r[k] for k in keys} for n, r in suite.items()}
+            json.dump({"scale": args.scale, "jobs": baseline}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["scale"] != args.scale:
+            sys.exit(f"❌ {args.check} was recorded at --scale {baseline['scale']}, not {args.scale}")
+        problems = check_regressions(suite, baseline["jobs"])
+        if problems:
+            print("❌ Benchmark regressions:")
+            for p in problems:
+                print(f"  - {p}")
+            sys.exit(1)
+        print("✅ No regressions against", args.check)
@@ -0,0 +1,143 @@
+"""
+Skip work when the source spreadsheets have not changed since the last run.
+
+Two levels, both remembered per job in the state store:
+
+* Drive metadata (modifiedTime + version) of every source spreadsheet — if it
+  matches, neither the read nor the write is needed.
+* A digest of the values that were read — if the metadata moved but the data
+  the job actually uses is the same, the write is skipped.
+
+Both are saved only after the write succeeded, so a failed job simply runs again
+next time while the jobs that finished are skipped. Inside one write, a
+Checkpoint remembers which chunks already went out, so a rerun with the same
+data sends only the rest.
+
+Set FORCE_SYNC=1 to ignore the stored state for a run.
+"""
+import os
+import json
+import hashlib
+import threading
+
+from gspread.urls import DRIVE_FILES_API_V3_URL
+
+import gsheet_client
+from state_store import default_store
+from table import Table
+
+FORCE_SYNC = os.environ.get("FORCE_SYNC", "").lower() in ("1", "true", "yes")
+
+
+def drive_metadata(spreadsheet_id):
+    """modifiedTime / version of a spreadsheet from the Drive API (one small GET)."""
+    response = gsheet_client.get_client().http_client.request(
+        "get",
+        f"{DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+        params={"fields": "id,modifiedTime,version", "supportsAllDrives": True},
+    )
+    data = response.json()
+    return {"modifiedTime": data.get("modifiedTime"), "version": data.get("version")}
+
+
+def _plain(value):
+    # Tables hash like the rows they hold
+    return value.to_rows() if isinstance(value, Table) else str(value)
+
+
+def digest(*values):
+    payload = json.dumps(values, sort_keys=True, default=_plain, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SourceWatch:
+    """
+    Usage inside a job:
+
+        watch = SourceWatch("updateRecovery", [source_id])
+        if watch.skip_read():
+            return
+        data = ...read...
+        if not watch.skip_write(data):
+            ...write...
+        watch.commit()
+    """
+
+    def __init__(self, job, spreadsheet_ids, extra=None, store=None, metadata=drive_metadata):
+        self.job = job
+        self.spreadsheet_ids = list(spreadsheet_ids)
+        self.extra = extra  # anything else the output depends on (e.g. a filter date)
+        self.store = store or default_store()
+        self.metadata = metadata
+        self.previous = self.store.get(f"watch:{job}") or {}
+        self.fingerprint = None
+        self.content = None
+
+    def skip_read(self):
+        try:
+            self.fingerprint = {sid: self.metadata(sid) for sid in self.spreadsheet_ids}
+        except Exception as e:
+            print(f"⚠️ {self.job}: change check unavailable ({e}), running in full")
+            self.fingerprint = None
+            return False
+
+        self.fingerprint["extra"] = self.extra
+        if not FORCE_SYNC and self.previous.get("fingerprint") == self.fingerprint:
+            print(f"⏭️ {self.job}: sources unchanged since last run, skipping")
+            return True
+        return False
+
+    def skip_write(self, *values):
+        self.content = digest(self.extra, *values)
+        if not FORCE_SYNC and self.previous.get("digest") == self.content:
+            print(f"⏭️ {self.job}: data unchanged, skipping write")
+            return True
+        return False
+
+    def checkpoint(self):
+        """Chunk progress for this run's write, tied to the data digest (or the source metadata)."""
+        if self.content is None and self.fingerprint is None:
+            return None  # nothing identifies the data, so progress can't be trusted on a rerun
+        return Checkpoint(self.job, self.content or digest(self.fingerprint), self.store)
+
+    def commit(self):
+        """Remember this run's state — call only after the target was written successfully."""
+        if self.fingerprint is None and self.content is None:
+            return
+        self.store.set(f"watch:{self.job}", {"fingerprint": self.fingerprint, "digest": self.content})
+        self.store.delete(f"checkpoint:{self.job}")  # the write is complete
+
+
+class Checkpoint:
+    """
+    Which steps (chunks, windows, tabs) of one job's write are already done:
+
+        checkpoint = watch.checkpoint()
+        for i, chunk in enumerate(chunks):
+            if checkpoint.done(i):
+                continue
+            write(chunk)
+            checkpoint.mark(i)
+        watch.commit()  # the write is complete, drops the saved progress
+
+    Progress saved for a different `version` (other data) is ignored.
+    """
+
+    def __init__(self, job, version, store=None):
+        self.job = job
+        self.key = f"checkpoint:{job}"
+        self.version = version
+        self.store = store or default_store()
+        self._lock = threading.Lock()
+        saved = self.store.get(self.key) or {}
+        self.completed = set(saved.get("done", [])) if saved.get("version") == version else set()
+        if self.completed:
+            print(f"↩️ {job}: resuming, {len(self.completed)} step(s) already written")
+
+    def done(self, step):
+        return str(step) in self.completed
+
+    def mark(self, step):
+        with self._lock:
+            self.completed.add(str(step))
+            self.store.set(self.key, {"version": self.version, "done": sorted(self.completed)})
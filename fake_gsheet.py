@@ -0,0 +1,453 @@
+"""
+In-memory stand-in for gspread objects, so sheet logic can be exercised offline.
+
+FakeClient / FakeSpreadsheet / FakeWorksheet mimic the parts of gspread the jobs
+use. A shared FakeBackend counts API calls and cells, and can add per-call
+latency and a per-minute quota (429 once exceeded). `serve()` exposes a
+FakeClient's spreadsheets over HTTP at the Sheets v4 values:batchGet path for
+code that talks HTTP itself (async_sheets).
+"""
+import json
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+
+def _strip_sheet(range_name):
+    """'Tab'!A1:B2 -> A1:B2"""
+    return range_name.split("!", 1)[1] if "!" in range_name else range_name
+
+
+def _sheet_of(range_name):
+    """'Tab'!A1:B2 -> Tab"""
+    return range_name.split("!", 1)[0].strip("'").replace("''", "'")
+
+
+def _trim(values):
+    """Drop trailing empty cells / rows the same way the Sheets API does."""
+    out = [list(r) for r in values]
+    for r in out:
+        while r and r[-1] in ("", None):
+            r.pop()
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+def _columns(values):
+    """Row-major grid -> column-major, trimmed like majorDimension=COLUMNS responses."""
+    width = max([len(r) for r in values] + [0])
+    return _trim([[r[c] if c < len(r) else "" for r in values] for c in range(width)])
+
+
+def _cells(values):
+    return sum(len(r) for r in values)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = {}
+        self._payload = payload
+        self.text = json.dumps(payload)
+
+    def json(self):
+        return self._payload
+
+
+class FakeBackend:
+    """Shared accounting for one fake 'Google': latency, quota and counters."""
+
+    def __init__(self, latency=0.0, quota_per_minute=None, clock=time.monotonic):
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {"read": 0, "write": 0, "meta": 0}
+            self.cells_read = 0
+            self.cells_written = 0
+            self.throttled = 0
+            self.log = []
+
+    def hit(self, kind, op, cells=0):
+        with self._lock:
+            now = self.clock()
+            if self.quota_per_minute:
+                while self._recent and now - self._recent[0] > 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota_per_minute:
+                    self.throttled += 1
+                    raise APIError(FakeResponse(429, {"error": {
+                        "code": 429, "message": "Quota exceeded (fake)", "status": "RESOURCE_EXHAUSTED"}}))
+                self._recent.append(now)
+            self.calls[kind] += 1
+            if kind == "read":
+                self.cells_read += cells
+            elif kind == "write":
+                self.cells_written += cells
+            self.log.append((op, cells))
+        if self.latency:
+            time.sleep(self.latency)
+
+    def summary(self):
+        return {
+            "api_calls": sum(self.calls.values()),
+            "calls": dict(self.calls),
+            "cells_read": self.cells_read,
+            "cells_written": self.cells_written,
+            "throttled": self.throttled,
+        }
+
+
+class FakeCell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeWorksheet:
+    def __init__(self, title, values=None, backend=None, spreadsheet=None):
+        self.title = title
+        self.values = [list(r) for r in (values or [])]
+        self.backend = backend
+        self.spreadsheet = spreadsheet
+        self.id = abs(hash(title)) % 10**9
+        self.calls = []
+        # grid size: the values API grows it, updateCells must stay inside it
+        self.row_count = max(len(self.values), 1000)
+        self.col_count = max([len(r) for r in self.values] + [26])
+
+    def _hit(self, kind, op, arg, cells=0):
+        self.calls.append((op, arg))
+        if self.backend:
+            self.backend.hit(kind, op, cells)
+        if kind == "write" and self.spreadsheet:
+            self.spreadsheet.touched()
+
+    # ----- grid helpers -----
+    def _bounds(self, range_name):
+        return self._grid_bounds(a1_range_to_grid_range(_strip_sheet(range_name)))
+
+    def _grid_bounds(self, grid):
+        r0 = grid.get("startRowIndex", 0)
+        c0 = grid.get("startColumnIndex", 0)
+        r1 = grid.get("endRowIndex", max(len(self.values), r0))
+        c1 = grid.get("endColumnIndex", max([len(r) for r in self.values] + [c0]))
+        return r0, c0, r1, c1
+
+    def _ensure(self, rows, cols):
+        while len(self.values) < rows:
+            self.values.append([])
+        for r in self.values[:rows]:
+            if len(r) < cols:
+                r.extend([""] * (cols - len(r)))
+
+    def _shift_rows(self, grid, inserting):
+        """insertRange / deleteRange with shiftDimension ROWS: only the range's columns move."""
+        r0, c0, r1, c1 = self._grid_bounds(grid)
+        n, last = r1 - r0, len(self.values)
+        if r0 >= last:
+            return
+        self._ensure(last + (n if inserting else 0), c1)
+        if inserting:
+            for i in range(last + n - 1, r1 - 1, -1):
+                self.values[i][c0:c1] = self.values[i - n][c0:c1]
+            for i in range(r0, r1):
+                self.values[i][c0:c1] = [""] * (c1 - c0)
+            for row in self.values[self.row_count:]:  # pushed past the grid: lost
+                row[c0:c1] = [""] * (c1 - c0)
+        else:
+            for i in range(r0, last):
+                self.values[i][c0:c1] = self.values[i + n][c0:c1] if i + n < last else [""] * (c1 - c0)
+
+    def _read(self, range_name):
+        r0, c0, r1, c1 = self._bounds(range_name)
+        block = [row[c0:c1] for row in self.values[r0:r1]]
+        return _trim(block)
+
+    def _write(self, range_name, values):
+        r0, c0, _, _ = self._bounds(range_name)
+        self.row_count = max(self.row_count, r0 + len(values))
+        self.col_count = max([self.col_count] + [c0 + len(r) for r in values])
+        self._write_at(r0, c0, values)
+
+    def _write_at(self, r0, c0, values):
+        rows = r0 + len(values)
+        columns = max([c0 + len(r) for r in values] + [0])
+        if rows > self.row_count or columns > self.col_count:
+            raise APIError(FakeResponse(400, {"error": {
+                "code": 400, "status": "INVALID_ARGUMENT",
+                "message": f"Range ({self.title}!R{rows}C{columns}) exceeds grid limits. "
+                           f"Max rows: {self.row_count}, max columns: {self.col_count}",
+            }}))
+        for i, row in enumerate(values):
+            self._ensure(r0 + i + 1, c0 + len(row))
+            for j, v in enumerate(row):
+                self.values[r0 + i][c0 + j] = "" if v is None else v
+
+    def _clear(self, range_name):
+        self._clear_grid(a1_range_to_grid_range(_strip_sheet(range_name)))
+
+    def _clear_grid(self, grid):
+        r0, c0, r1, c1 = self._grid_bounds(grid)
+        for row in self.values[r0:r1]:
+            for j in range(c0, min(c1, len(row))):
+                row[j] = ""
+
+    # ----- gspread surface -----
+    def get(self, range_name=None, **kwargs):
+        values = self._read(range_name or "A:ZZZ")
+        self._hit("read", "get", range_name, _cells(values))
+        return values
+
+    def get_all_values(self, **kwargs):
+        values = [[str(v) for v in r] for r in self._read("A:ZZZ")]
+        self._hit("read", "get_all_values", None, _cells(values))
+        return values
+
+    def acell(self, label, **kwargs):
+        block = self._read(label)
+        self._hit("read", "acell", label, 1)
+        return FakeCell(block[0][0] if block and block[0] else None)
+
+    def update(self, values=None, range_name=None, **kwargs):
+        # gspread accepts the old (range_name, values) order too
+        if isinstance(values, str):
+            values, range_name = range_name, values
+        self._hit("write", "update", range_name, _cells(values))
+        self._write(range_name or "A1", values)
+
+    def batch_update(self, data, **kwargs):
+        self._hit("write", "batch_update", [d["range"] for d in data], sum(_cells(d["values"]) for d in data))
+        for d in data:
+            self._write(d["range"], d["values"])
+
+    def batch_clear(self, ranges):
+        self._hit("write", "batch_clear", list(ranges))
+        for r in ranges:
+            self._clear(r)
+
+    def clear(self):
+        self._hit("write", "clear", None)
+        self.values = []
+
+    def add_rows(self, rows):
+        self._hit("write", "add_rows", rows)
+        self.row_count += rows
+
+    def hide(self):
+        self._hit("write", "hide", None)
+
+
+class FakeSpreadsheet:
+    def __init__(self, spreadsheet_id, tabs=None, backend=None, drive=None):
+        self.id = spreadsheet_id
+        self.title = spreadsheet_id
+        self.backend = backend
+        self.drive = drive
+        self.tabs = {}
+        for title, values in (tabs or {}).items():
+            self.tabs[title] = FakeWorksheet(title, values, backend, self)
+
+    def touched(self):
+        if self.drive:
+            self.drive.touch(self.id)
+
+    def worksheet(self, title):
+        if self.backend:
+            self.backend.hit("meta", "worksheet")
+        if title not in self.tabs:
+            raise WorksheetNotFound(title)
+        return self.tabs[title]
+
+    def worksheets(self):
+        if self.backend:
+            self.backend.hit("meta", "worksheets")
+        return list(self.tabs.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        if self.backend:
+            self.backend.hit("meta", "add_worksheet")
+        ws = self.tabs[title] = FakeWorksheet(title, [], self.backend, self)
+        ws.row_count, ws.col_count = rows, cols
+        return ws
+
+    def batch_update(self, body):
+        """
+        spreadsheets.batchUpdate — updateCells (values, within the grid),
+        appendDimension and insertRange / deleteRange (ROWS) are emulated,
+        other requests are accepted.
+        """
+        by_id = {ws.id: ws for ws in self.tabs.values()}
+        cells = 0
+        for request in body["requests"]:
+            append = request.get("appendDimension")
+            if append is not None:
+                ws = by_id[append["sheetId"]]
+                if append["dimension"] == "ROWS":
+                    ws.row_count += append["length"]
+                else:
+                    ws.col_count += append["length"]
+                continue
+            shift = request.get("insertRange") or request.get("deleteRange")
+            if shift is not None:
+                by_id[shift["range"]["sheetId"]]._shift_rows(shift["range"], "insertRange" in request)
+                continue
+            update = request.get("updateCells")
+            if update is None:
+                continue
+            if "range" in update:
+                by_id[update["range"]["sheetId"]]._clear_grid(update["range"])
+            else:
+                start = update["start"]
+                values = [
+                    [next(iter(c.get("userEnteredValue", {"": ""}).values())) for c in row.get("values", [])]
+                    for row in update.get("rows", [])
+                ]
+                cells += _cells(values)
+                by_id[start["sheetId"]]._write_at(start.get("rowIndex", 0), start.get("columnIndex", 0), values)
+        if self.backend:
+            self.backend.hit("write", "spreadsheet_batch_update", cells)
+        self.touched()
+        return {"spreadsheetId": self.id, "replies": [{} for _ in body["requests"]]}
+
+    def values_batch_get(self, ranges, params=None):
+        value_ranges = []
+        columns = (params or {}).get("majorDimension") == "COLUMNS"
+        for r in ranges:
+            values = self.tabs[_sheet_of(r)]._read(r)
+            if columns:
+                values = _columns(values)
+            value_ranges.append({"range": r, "values": values})
+        if self.backend:
+            self.backend.hit("read", "values_batch_get", sum(_cells(v["values"]) for v in value_ranges))
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+
+class FakeHTTPClient:
+    """The slice of gspread.HTTPClient that helpers call directly."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def values_batch_get(self, spreadsheet_id, ranges, params=None):
+        return self.client.spreadsheets[spreadsheet_id].values_batch_get(ranges, params)
+
+    def request(self, method, endpoint, params=None, **kwargs):
+        if "/spreadsheets/" in endpoint:
+            return FakeResponse(200, self.client.sheets_request(method, endpoint, params, kwargs.get("json")))
+        # otherwise Drive file metadata
+        file_id = endpoint.rstrip("/").rsplit("/", 1)[-1]
+        if self.client.backend:
+            self.client.backend.hit("meta", "drive_metadata")
+        return FakeResponse(200, dict(self.client.drive.metadata(file_id), id=file_id))
+
+
+class FakeClient:
+    def __init__(self, spreadsheets=None, latency=0.0, quota_per_minute=None):
+        self.backend = FakeBackend(latency, quota_per_minute)
+        self.drive = FakeDrive()
+        self.spreadsheets = {}
+        self.http_client = FakeHTTPClient(self)
+        for spreadsheet_id, tabs in (spreadsheets or {}).items():
+            self.add_spreadsheet(spreadsheet_id, tabs)
+
+    def add_spreadsheet(self, spreadsheet_id, tabs):
+        self.spreadsheets[spreadsheet_id] = FakeSpreadsheet(spreadsheet_id, tabs, self.backend, self.drive)
+        return self.spreadsheets[spreadsheet_id]
+
+    def open_by_key(self, key):
+        self.backend.hit("meta", "open_by_key")
+        return self.spreadsheets[key]
+
+    def sheets_request(self, method, endpoint, params=None, body=None):
+        """
+        One Sheets v4 call by URL ({id}/values:batchGet, the one async_sheets
+        makes). Returns the response body.
+        """
+        path = urlsplit(endpoint).path.split("/spreadsheets/", 1)[1]
+        if "/values:" in path:
+            spreadsheet_id, action = path.split("/values:", 1)
+            action = "values:" + action
+        else:
+            spreadsheet_id, _, action = path.partition(":")
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        handlers = {
+            ("get", "values:batchGet"): lambda: spreadsheet.values_batch_get(
+                (params or {}).get("ranges", []), {k: v for k, v in (params or {}).items() if k != "ranges"}),
+        }
+        handler = handlers.get((method.lower(), action))
+        if spreadsheet is None or handler is None:
+            raise APIError(FakeResponse(404, {"error": {
+                "code": 404, "message": f"Not found (fake): {method.upper()} {path}", "status": "NOT_FOUND"}}))
+        return handler()
+
+
+class FakeDrive:
+    """
+    Stand-in for Drive file metadata. Pass `drive.metadata` wherever a
+    `metadata(spreadsheet_id)` callable is expected; `touch()` simulates an edit.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.calls = 0
+
+    def touch(self, spreadsheet_id):
+        meta = self.files.setdefault(spreadsheet_id, {"version": 0})
+        meta["version"] += 1
+        meta["modifiedTime"] = f"2025-01-01T00:00:{meta['version']:02d}.000Z"
+
+    def metadata(self, spreadsheet_id):
+        self.calls += 1
+        if spreadsheet_id not in self.files:
+            self.touch(spreadsheet_id)
+        meta = self.files[spreadsheet_id]
+        return {"modifiedTime": meta["modifiedTime"], "version": str(meta["version"])}
+
+
+class _SheetsHandler(BaseHTTPRequestHandler):
+    client = None  # set per server by serve()
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        params = {k: v if k == "ranges" else v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        try:
+            status, payload = 200, self.client.sheets_request(method, url.path, params, body)
+        except APIError as e:
+            status, payload = e.response.status_code, e.response.json()
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("get")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(client, host="127.0.0.1", port=0):
+    """
+    Serves `client`'s spreadsheets at http://host:port/v4/spreadsheets/... from a
+    background thread. Returns (server, base_url); call server.shutdown() when done.
+    """
+    handler = type("SheetsHandler", (_SheetsHandler,), {"client": client})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v4/spreadsheets"
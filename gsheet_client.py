@@ -0,0 +1,201 @@
+"""
+Process-wide gspread client and a small TTL cache of spreadsheet / worksheet handles.
+
+Every job in a run shares one authorized client (one credentials parse, one token,
+one keep-alive HTTP connection pool, one quota scheduler) instead of re-authorizing
+and re-opening the same spreadsheets. token_cache can carry the token over to the
+next run as well.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import gspread
+from gspread.utils import absolute_range_name, column_letter_to_index
+from google.auth.transport.requests import Request
+from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+
+import token_cache
+import tracing
+from quota import QuotaHTTPClient
+from sheet_sync import column_runs
+from table import Table
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+SERVICE_ACCOUNT_FILE = r"C:\Users\skuma\Desktop\Python\Account key.json"
+
+HANDLE_TTL = float(os.environ.get("GSHEET_HANDLE_TTL", "600"))  # seconds
+POOL_SIZE = int(os.environ.get("GSHEET_POOL_SIZE", "10"))
+# spreadsheets read side by side in one batch_get()
+BATCH_GET_WORKERS = int(os.environ.get("GSHEET_BATCH_GET_WORKERS", "4"))
+
+_lock = threading.RLock()
+_client = None
+_handles = {}  # cache key -> (expires_at, handle)
+
+
+# ===== AUTH =====
+def load_credentials(scopes=SCOPES):
+    """Service account from ACCOUNT_KEY_JSON (GitHub Actions) or the local key file."""
+    key_data = os.environ.get("ACCOUNT_KEY_JSON")
+
+    if key_data:
+        print("🔐 Using service account from environment variable (GitHub Actions)")
+        try:
+            creds = Credentials.from_service_account_info(json.loads(key_data), scopes=scopes)
+            print("✅ Service account loaded from secret.")
+            return creds
+        except Exception as e:
+            raise ValueError(f"❌ Failed to load service account from env: {e}")
+
+    if os.path.exists(SERVICE_ACCOUNT_FILE):
+        print("💾 Using local service account file")
+        return Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=scopes)
+
+    raise FileNotFoundError("❌ Service account credentials not found.")
+
+
+def get_client():
+    """Returns the shared, authorized gspread client (created on first use)."""
+    global _client
+    with _lock:
+        if _client is None:
+            # every call is paced / retried by the shared quota scheduler
+            # one token for every thread, reused across runs when GSHEET_TOKEN_CACHE is set
+            creds = token_cache.attach(load_credentials())
+            client = gspread.authorize(creds, http_client=QuotaHTTPClient)
+            # keep-alive pool big enough for jobs running side by side
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            client.http_client.session.mount("https://", adapter)
+            _client = client
+        return _client
+
+
+def ensure_token():
+    """
+    Mints the access token now unless a valid one is already held (cached or
+    fresh), so the token exchange happens, and is timed, at startup rather
+    than inside the first job's first call.
+    """
+    creds = getattr(get_client().http_client, "auth", None)
+    if creds is not None and not creds.valid:
+        creds.refresh(Request())
+
+
+def set_client(client):
+    """Swap in another client (e.g. an offline fake) and drop cached handles."""
+    global _client
+    with _lock:
+        _client = client
+        _handles.clear()
+
+
+# ===== HANDLE CACHE =====
+def _cached(key, factory):
+    now = time.monotonic()
+    with _lock:
+        hit = _handles.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    # the fetch is a network call: other threads keep using the cache meanwhile
+    handle = factory()
+
+    with _lock:
+        hit = _handles.get(key)
+        if hit and hit[0] > now:
+            return hit[1]  # another thread fetched it first; share that handle
+        _handles[key] = (now + HANDLE_TTL, handle)
+        # evict anything else that has expired
+        for k in [k for k, (exp, _) in _handles.items() if exp <= now]:
+            del _handles[k]
+        return handle
+
+
+def open_spreadsheet(spreadsheet_id):
+    """Memoized client.open_by_key()."""
+    return _cached(("ss", spreadsheet_id), lambda: get_client().open_by_key(spreadsheet_id))
+
+
+def open_worksheet(spreadsheet_id, tab):
+    """Memoized open_by_key(...).worksheet(tab)."""
+    return _cached(("ws", spreadsheet_id, tab), lambda: open_spreadsheet(spreadsheet_id).worksheet(tab))
+
+
+# ===== BATCH READS =====
+def batch_get(requests, value_render_option=None, major_dimension=None):
+    """
+    Reads many ranges with one values:batchGet per spreadsheet; different
+    spreadsheets are fetched concurrently.
+
+    `requests` is a list of (spreadsheet_id, tab, range) tuples; the result is a
+    list of value grids in the same order.
+    """
+    groups = {}
+    for i, (spreadsheet_id, tab, range_name) in enumerate(requests):
+        groups.setdefault(spreadsheet_id, []).append((i, absolute_range_name(tab, range_name)))
+
+    params = {}
+    if value_render_option:
+        params["valueRenderOption"] = value_render_option
+    if major_dimension:
+        params["majorDimension"] = major_dimension
+    http = get_client().http_client
+
+    def fetch(group):
+        spreadsheet_id, items = group
+        return items, http.values_batch_get(
+            spreadsheet_id, [r for _, r in items], params=dict(params) if params else None
+        )
+
+    if len(groups) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(groups), BATCH_GET_WORKERS)) as pool:
+            responses = list(pool.map(tracing.carry(fetch), groups.items()))
+    else:
+        responses = [fetch(group) for group in groups.items()]
+
+    results = [None] * len(requests)
+    for items, response in responses:
+        for (i, _), value_range in zip(items, response.get("valueRanges", [])):
+            results[i] = value_range.get("values", [])
+    return results
+
+
+def batch_get_columns(requests, value_render_option=None):
+    """
+    Column-projected batch_get: fetches only the columns a job uses.
+
+    `requests` is a list of (spreadsheet_id, tab, columns) where `columns` is
+    the output column order as letters, e.g. ["B", "C", "F", "L"]; an optional
+    fourth item (first_row, last_row) limits the rows. Contiguous columns are
+    read as one range (B:C, F:F, L:L), everything in the same batched call,
+    column-major. Returns one Table per request, built on the fetched columns
+    without copying them; every row is exactly len(columns) wide.
+    """
+    ranges, starts, layout = [], [], []
+    for spreadsheet_id, tab, columns, *rows in requests:
+        first_row, last_row = rows[0] if rows else ("", "")
+        first = len(ranges)
+        for run in column_runs(columns):
+            left, right = run.split(":")
+            ranges.append((spreadsheet_id, tab, f"{left}{first_row}:{right}{last_row}"))
+            starts.append(column_letter_to_index(left))
+        layout.append((first, len(ranges), columns))
+
+    grids = batch_get(ranges, value_render_option, major_dimension="COLUMNS")
+
+    results = []
+    for first, last, columns in layout:
+        by_index = {}
+        for start, grid in zip(starts[first:last], grids[first:last]):
+            for offset, column in enumerate(grid):
+                by_index[start + offset] = column
+        picked = [by_index.get(column_letter_to_index(c), []) for c in columns]
+        results.append(Table(picked))
+    return results
@@ -0,0 +1,126 @@
+"""
+Tiny DAG scheduler for sheet jobs.
+
+Each job declares the tabs it reads and writes. A job waits for every earlier
+job it conflicts with (read-after-write, write-after-read, write-after-write);
+everything else runs side by side in a thread pool.
+
+`takes` hands an upstream job's return value to a downstream job as a keyword
+argument, so data produced in this process does not have to be re-read from the
+tab it was just written to.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import tracing
+
+
+class Job:
+    def __init__(self, name, func, reads=(), writes=(), takes=None):
+        self.name = name
+        self.func = func
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.takes = dict(takes or {})  # {keyword argument: upstream job name}
+
+    def conflicts_with(self, earlier):
+        return bool(
+            self.reads & earlier.writes
+            or self.writes & earlier.reads
+            or self.writes & earlier.writes
+        )
+
+
+def build_dependencies(jobs):
+    """{job name: [names of earlier jobs it must wait for]} — list order breaks ties."""
+    deps = {}
+    for i, job in enumerate(jobs):
+        deps[job.name] = [
+            e.name for e in jobs[:i]
+            if job.conflicts_with(e) or e.name in job.takes.values()
+        ]
+    return deps
+
+
+def critical_path(jobs, deps, durations):
+    """Longest chain of dependent jobs by duration -> (seconds, [names])."""
+    best = {}
+    for job in jobs:  # jobs are already in dependency order
+        prev = max(deps[job.name], key=lambda d: best[d][0], default=None)
+        base, chain = best[prev] if prev else (0.0, [])
+        best[job.name] = (base + durations.get(job.name, 0.0), chain + [job.name])
+    return max(best.values(), key=lambda b: b[0], default=(0.0, []))
+
+
+def run_jobs(jobs, max_workers=4):
+    """
+    Runs jobs as soon as their dependencies finish. A job that raises marks its
+    dependents as skipped. Returns a report dict (also printed).
+    """
+    deps = build_dependencies(jobs)
+    by_name = {j.name: j for j in jobs}
+    status, results, durations = {}, {}, {}
+    pending = [j.name for j in jobs]
+    running = {}
+
+    t0 = time.perf_counter()
+
+    def timed(job):
+        # upstream results that exist (None = upstream skipped / wrote nothing new)
+        kwargs = {
+            arg: results[upstream] for arg, upstream in job.takes.items()
+            if results.get(upstream) is not None
+        }
+        start = time.perf_counter()
+        try:
+            with tracing.job(job.name):
+                return job.func(**kwargs)
+        finally:
+            durations[job.name] = time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(status.get(d) in ("failed", "skipped") for d in deps[name]):
+                    status[name] = "skipped"
+                    pending.remove(name)
+                    print(f"⏭️ {name} skipped (upstream failed)")
+                elif all(status.get(d) == "ok" for d in deps[name]):
+                    running[pool.submit(timed, by_name[name])] = name
+                    pending.remove(name)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    status[name] = "ok"
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"❌ {name} failed: {e}")
+
+    wall = time.perf_counter() - t0
+    path_time, path = critical_path(jobs, deps, durations)
+
+    report = {
+        "wall_seconds": round(wall, 3),
+        "serial_seconds": round(sum(durations.values()), 3),
+        "critical_path_seconds": round(path_time, 3),
+        "critical_path": path,
+        "jobs": {
+            j.name: {
+                "status": status.get(j.name),
+                "seconds": round(durations.get(j.name, 0.0), 3),
+                "after": deps[j.name],
+            }
+            for j in jobs
+        },
+        "results": results,
+    }
+
+    print(f"⏱️ Wall {report['wall_seconds']}s | serial {report['serial_seconds']}s | "
+          f"critical path {report['critical_path_seconds']}s ({' → '.join(path)})")
+    return report
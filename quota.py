@@ -0,0 +1,115 @@
+"""
+Quota-aware request scheduling for every Sheets call made through gsheet_client.
+
+* Token buckets for the Sheets read and write per-minute quotas, shared by every
+  job / thread in the process, so calls are paced instead of rejected.
+* Jittered exponential backoff on 408 / 429 / 5xx (honouring Retry-After).
+"""
+import os
+import time
+import random
+import threading
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+import tracing
+
+READS_PER_MINUTE = float(os.environ.get("SHEETS_READS_PER_MINUTE", "60"))
+WRITES_PER_MINUTE = float(os.environ.get("SHEETS_WRITES_PER_MINUTE", "60"))
+MAX_RETRIES = int(os.environ.get("SHEETS_MAX_RETRIES", "6"))
+BACKOFF_BASE = 1.0   # seconds
+BACKOFF_CAP = 64.0   # seconds
+
+RETRY_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """`rate_per_minute` tokens refill continuously; up to `burst` can be spent at once."""
+
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or rate_per_minute)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, n=1):
+        """Blocks until `n` tokens are available; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    self.waited += waited
+                    return waited
+                delay = (n - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+class RequestScheduler:
+    def __init__(self, reads_per_minute=READS_PER_MINUTE, writes_per_minute=WRITES_PER_MINUTE):
+        self.reads = TokenBucket(reads_per_minute)
+        self.writes = TokenBucket(writes_per_minute)
+        self.retries = 0
+
+    def bucket_for(self, method, url):
+        if "sheets.googleapis.com" not in url:
+            return None  # Drive metadata etc. has its own, much larger quota
+        return self.reads if method.lower() == "get" else self.writes
+
+    def backoff(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+scheduler = RequestScheduler()
+
+
+class QuotaHTTPClient(HTTPClient):
+    """gspread HTTP client that paces every call through the shared `scheduler`."""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        bucket = scheduler.bucket_for(method, endpoint)
+        attempt = 0
+        while True:
+            if bucket:
+                bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = super().request(method, endpoint, *args, **kwargs)
+                tracing.record_http(method, endpoint, kwargs.get("params"), kwargs.get("json"),
+                                    response, time.perf_counter() - start)
+                return response
+            except APIError as e:
+                tracing.record_http(method, endpoint, kwargs.get("params"), kwargs.get("json"),
+                                    e.response, time.perf_counter() - start)
+                if e.code not in RETRY_CODES or attempt >= MAX_RETRIES:
+                    raise
+                delay = scheduler.backoff(attempt, e.response.headers.get("Retry-After"))
+                reason = e.code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = scheduler.backoff(attempt)
+                reason = type(e).__name__
+
+            attempt += 1
+            scheduler.retries += 1
+            print(f"⏳ Sheets API {reason}, retry {attempt}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
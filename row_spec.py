@@ -0,0 +1,280 @@
+"""
+Declarative row specs: the columns a job reads, the rows it keeps and how the
+kept columns are mapped, compiled once into a plan that works a column at a
+time.
+
+    OS_SUMMARY = RowSpec(
+        columns=letters("A", "Q"),
+        where=[OneOf(1, ["delhi ncr", "sukhrali", "noida", "delhi"], normalize=folded)],
+    ).compile()
+
+    kept = OS_SUMMARY.filter(rows)                 # the matching rows themselves
+    table = CNG_OS.apply(data, day=filter_date)    # filtered + mapped, as a Table
+
+Predicates and mappings run once per distinct value of their column and the
+results are looked up per row. Normalized / parsed values stay cached on the
+plan, so the next run in the same process starts warm. Adding a city or an
+output column is a change to the spec, not a new loop.
+"""
+from array import array
+
+from gspread.utils import column_letter_to_index, rowcol_to_a1
+
+from table import Table
+
+# distinct values remembered per cached function before the cache starts over
+CACHE_LIMIT = 200_000
+
+
+# ===== NORMALIZERS / COERCIONS =====
+def text(value):
+    return str(value).strip()
+
+
+def folded(value):
+    """Case-insensitive text: 'Delhi NCR ' -> 'delhi ncr'."""
+    return str(value).strip().lower()
+
+
+def number(value, digits=2):
+    """'1,234.567' / 1234.567 -> 1234.57; anything that is not a number -> ''."""
+    try:
+        value = str(value).replace(",", "").strip()
+        return round(float(value), digits)
+    except (TypeError, ValueError):
+        return ""
+
+
+def letters(first, last):
+    """Column letters first..last: letters("A", "D") -> ["A", "B", "C", "D"]."""
+    start, stop = column_letter_to_index(first), column_letter_to_index(last)
+    return [rowcol_to_a1(1, c)[:-1] for c in range(start, stop + 1)]
+
+
+class _Failed:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _Cache:
+    """
+    func(value) remembered per distinct value. With `catch`, the TypeError /
+    ValueError func raises is remembered (as _Failed) instead of propagating.
+    """
+
+    def __init__(self, func, catch=False):
+        self.func = func
+        self.catch = catch
+        self.values = {}
+
+    def __call__(self, value):
+        try:
+            return self.values[value]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable cell: nothing to share
+            return self._compute(value)
+        if len(self.values) >= CACHE_LIMIT:
+            self.values.clear()
+        result = self.values[value] = self._compute(value)
+        return result
+
+    def _compute(self, value):
+        if not self.catch:
+            return self.func(value)
+        try:
+            return self.func(value)
+        except (TypeError, ValueError) as e:
+            return _Failed(e)
+
+
+# ===== PREDICATES =====
+class OneOf:
+    """normalize(value) is one of `values`."""
+    blank = None  # blanks are normalized and tested like any other value
+
+    def __init__(self, position, values, normalize=text):
+        self.position = position
+        self.values = frozenset(values)
+        self.normalize = normalize
+
+    def test(self, normalized, params):
+        return normalized in self.values
+
+
+class NoneOf(OneOf):
+    """normalize(value) is none of `values`."""
+
+    def test(self, normalized, params):
+        return normalized not in self.values
+
+
+class NotEmpty:
+    """The cell holds anything but a blank."""
+    normalize = None
+    blank = None
+
+    def __init__(self, position):
+        self.position = position
+
+    def test(self, value, params):
+        return value not in ("", None)
+
+
+class Equals:
+    """
+    normalize(value) == `value`, or == the `param` passed to apply() / filter().
+    Blank cells never match; cells normalize() rejects are reported and skipped.
+    """
+    blank = False
+
+    def __init__(self, position, value=None, param=None, normalize=text):
+        self.position = position
+        self.value = value
+        self.param = param
+        self.normalize = normalize
+
+    def test(self, normalized, params):
+        return normalized == (params[self.param] if self.param else self.value)
+
+
+# ===== MAPPINGS =====
+class Map:
+    """Output column = func(value) of one source column, once per distinct value."""
+
+    def __init__(self, position, func):
+        self.position = position
+        self.func = func
+
+
+class Number(Map):
+    """Output column coerced with number(): 2 decimals, '' for non-numbers."""
+
+    def __init__(self, position, digits=2):
+        super().__init__(position, number if digits == 2 else (lambda v: number(v, digits)))
+
+
+# ===== SPEC / PLAN =====
+class RowSpec:
+    def __init__(self, columns, where=(), select=None, skip=0, header=0):
+        """
+        `columns`  source columns as letters, in the order positions refer to
+        `where`    predicates every kept row satisfies
+        `select`   output columns: positions (copied as is) or Map / Number;
+                   None = every column
+        `skip`     leading rows dropped (title rows)
+        `header`   rows after those passed through unfiltered and unmapped
+        """
+        self.columns = list(columns)
+        self.where = list(where)
+        self.select = list(select) if select is not None else None
+        self.skip = skip
+        self.header = header
+
+    @property
+    def range(self):
+        """'A:Q' for contiguous columns — what a single-range read fetches."""
+        return f"{self.columns[0]}:{self.columns[-1]}"
+
+    def request(self, spreadsheet_id, tab, rows=None):
+        """(spreadsheet_id, tab, columns[, rows]) for gsheet_client.batch_get_columns."""
+        return (spreadsheet_id, tab, self.columns) + ((rows,) if rows else ())
+
+    def compile(self):
+        return RowPlan(self)
+
+
+class RowPlan:
+    """A compiled RowSpec; keep one per spec (module level) so its caches carry over."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        caches = {}  # one cache per normalizer / mapping function, shared by every use of it
+
+        def cached(func, catch):
+            if (func, catch) not in caches:
+                caches[func, catch] = _Cache(func, catch)
+            return caches[func, catch]
+
+        self.tests = [(p, cached(p.normalize, True) if p.normalize else None) for p in spec.where]
+        if spec.select is None:
+            self.outputs = None
+        else:
+            self.outputs = [
+                (s.position, cached(s.func, False)) if isinstance(s, Map) else (s, None) for s in spec.select
+            ]
+
+    # ----- rows -----
+    def keep(self, data, **params):
+        """Indexes into `data` (Table or rows) of the header rows and every row that passes."""
+        spec = self.spec
+        first = min(spec.skip + spec.header, len(data))
+        rows = list(range(spec.skip, first))
+        candidates = range(first, len(data))
+        for predicate, normalize in self.tests:
+            column = _column(data, predicate.position)
+            verdicts = {}
+            failed = {}
+            kept = []
+            for i in candidates:
+                value = column[i]
+                try:
+                    verdict = verdicts[value]
+                except KeyError:
+                    verdict = verdicts[value] = self._verdict(predicate, normalize, value, params, failed)
+                except TypeError:
+                    verdict = self._verdict(predicate, normalize, value, params, failed)
+                if verdict:
+                    kept.append(i)
+                elif value in failed:
+                    # same per-row report as the old row loops
+                    print(f"⚠️ Skipping row due to error: {failed[value]}")
+            candidates = kept
+        rows.extend(candidates)
+        return rows
+
+    @staticmethod
+    def _verdict(predicate, normalize, value, params, failed):
+        if normalize is None:
+            return predicate.test(value, params)
+        if predicate.blank is not None and value in ("", None):
+            return predicate.blank
+        normalized = normalize(value)
+        if isinstance(normalized, _Failed):
+            failed[value] = normalized.error
+            return False
+        return predicate.test(normalized, params)
+
+    def filter(self, rows, **params):
+        """The kept rows themselves (header rows first), unmapped — row-major data in, row lists out."""
+        return [rows[i] for i in self.keep(rows, **params)]
+
+    def apply(self, data, **params):
+        """Kept rows with the `select` mapping applied, as a Table (header rows are not mapped)."""
+        table = Table.of(data)
+        kept = table.filter(_mask(len(table), self.keep(table, **params)))
+        if self.outputs is None:
+            return kept
+        header = min(self.spec.header, len(kept))
+        columns = []
+        for position, mapping in self.outputs:
+            values = kept.column(position) if position < kept.width else [""] * len(kept)
+            if mapping is not None:
+                values = list(values[:header]) + [mapping(v) for v in values[header:]]
+            columns.append(values)
+        return Table(columns, height=len(kept))
+
+
+def _column(data, position):
+    if isinstance(data, Table):
+        return data.column(position) if position < data.width else [""] * len(data)
+    return [row[position] if position < len(row) else "" for row in data]
+
+
+def _mask(n, indexes):
+    mask = array("b", bytes(n))
+    for i in indexes:
+        mask[i] = 1
+    return mask
@@ -0,0 +1,102 @@
+"""
+One process for several sheet jobs.
+
+    python runner.py --group 0430          # everything scheduled at 04:30 UTC
+    python runner.py updateRecovery import_car_data
+    python runner.py --list
+
+Only the modules of the chosen jobs are imported, the Google client is
+authorized once and shared (its access token minted up front, or reused from
+GSHEET_TOKEN_CACHE), and the jobs run through pipeline.run_jobs so the
+independent ones overlap. Startup (imports + auth) is timed and reported as the
+"startup" job in the trace report.
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+
+import tracing
+
+# job name -> module that defines it in its JOBS list (listed in dependency order)
+JOB_MODULES = {
+    "ossummarycollection": "All_collection_recovery",
+    "updateRecovery": "All_collection_recovery",
+    "importCNGOSCollectionFast": "All_collection_recovery",
+    "import_car_data": "Main_car_info",
+    "Collection_carinfo": "Collection_carinfo",
+    "Allocation_deallocation": "Allocation_deallocation",
+    "All_allocation": "All_allocation",
+}
+
+GROUPS = {
+    "recovery": ["ossummarycollection", "updateRecovery", "importCNGOSCollectionFast"],
+    "0430": [
+        "ossummarycollection", "updateRecovery", "importCNGOSCollectionFast",
+        "Collection_carinfo", "Allocation_deallocation", "All_allocation",
+    ],
+    "all": list(JOB_MODULES),
+}
+
+
+def select(names=(), groups=()):
+    """Job names from explicit names and groups, in JOB_MODULES order, no duplicates."""
+    wanted = set(names)
+    for group in groups:
+        wanted.update(GROUPS[group])
+    unknown = wanted - set(JOB_MODULES)
+    if unknown:
+        raise SystemExit(f"❌ Unknown job(s): {', '.join(sorted(unknown))}")
+    return [name for name in JOB_MODULES if name in wanted]
+
+
+def load(names):
+    """Imports only the modules the chosen jobs live in and returns their Job objects."""
+    jobs = []
+    for name in names:
+        module = importlib.import_module(JOB_MODULES[name])
+        jobs.extend(job for job in module.JOBS if job.name == name)
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jobs", nargs="*", help="job names (see --list)")
+    parser.add_argument("--group", action="append", default=[], choices=sorted(GROUPS))
+    parser.add_argument("--workers", type=int, default=4, help="jobs run side by side")
+    parser.add_argument("--list", action="store_true", help="show jobs and groups")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, module in JOB_MODULES.items():
+            print(f"{name:28} {module}.py")
+        for group, names in GROUPS.items():
+            print(f"--group {group:20} {', '.join(names)}")
+        return None
+
+    names = select(args.jobs, args.group)
+    if not names:
+        parser.error("pick at least one job or --group")
+
+    with tracing.job("startup"):
+        tracing.phase("imports")
+        import gsheet_client
+        from pipeline import run_jobs
+        jobs = load(names)
+        imported = time.perf_counter()
+
+        tracing.phase("auth")
+        gsheet_client.ensure_token()
+        ready = time.perf_counter()
+
+    print(f"🚀 Startup {ready - _T0:.2f}s (imports {imported - _T0:.2f}s, auth {ready - imported:.2f}s) "
+          f"for {len(jobs)} job(s): {', '.join(names)}")
+    return run_jobs(jobs, max_workers=args.workers)
+
+
+if __name__ == "__main__":
+    report = main()
+    if report and any(job["status"] != "ok" for job in report["jobs"].values()):
+        raise SystemExit(1)
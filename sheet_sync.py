@@ -0,0 +1,498 @@
+import os
+import json
+import hashlib
+from collections import deque
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from table import Table
+from gspread.utils import a1_range_to_grid_range, column_letter_to_index, rowcol_to_a1
+
+# above this many cells a plan is sent as several batchUpdates (request size limits)
+WRITE_PLAN_MAX_CELLS = int(os.environ.get("WRITE_PLAN_MAX_CELLS", "250000"))
+
+# streaming copy: rows per read window, writes in flight at once
+STREAM_WINDOW_ROWS = int(os.environ.get("STREAM_WINDOW_ROWS", "2000"))
+STREAM_WORKERS = int(os.environ.get("STREAM_WORKERS", "2"))
+
+
+def sync_mode(variable, default, modes):
+    """
+    The sync mode a job reads from its own env `variable` (runner.py runs several
+    jobs in one process, so they can't share one). Raises ValueError on a value
+    outside `modes` instead of quietly falling back to another mode.
+    """
+    mode = os.environ.get(variable, default).strip().lower()
+    if mode not in modes:
+        raise ValueError(f"{variable}={mode!r}: expected one of {', '.join(modes)}")
+    return mode
+
+
+# ===== ROW HASHING =====
+def _normalize(value):
+    """Make values compare the same whether they came from the source or the target tab."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def pad_row(row, width):
+    """Cut / pad a row to exactly `width` cells."""
+    row = list(row[:width])
+    return row + [""] * (width - len(row))
+
+
+def row_hash(row, width):
+    """Stable digest of one row (trailing blanks don't count as a change)."""
+    cells = [_normalize(v) for v in pad_row(row, width)]
+    payload = json.dumps(cells, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def changed_runs(old_hashes, new_hashes):
+    """
+    Returns [(start, end), ...] half-open index runs where the two hash lists differ.
+    Indexes past the end of `new_hashes` are deleted rows.
+    """
+    runs = []
+    start = None
+    for i in range(max(len(old_hashes), len(new_hashes))):
+        old = old_hashes[i] if i < len(old_hashes) else None
+        new = new_hashes[i] if i < len(new_hashes) else None
+        if old != new:
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, max(len(old_hashes), len(new_hashes))))
+    return runs
+
+
+# ===== COLUMN PROJECTION =====
+def column_runs(columns):
+    """['L', 'B', 'C', 'F', 'G'] -> ['B:C', 'F:G', 'L:L'] — contiguous runs in sheet order."""
+    indexes = sorted({column_letter_to_index(c) for c in columns})
+    runs = []
+    for i in indexes:
+        if runs and runs[-1][1] == i - 1:
+            runs[-1][1] = i
+        else:
+            runs.append([i, i])
+    return [
+        f"{rowcol_to_a1(1, a).rstrip('0123456789')}:{rowcol_to_a1(1, b).rstrip('0123456789')}"
+        for a, b in runs
+    ]
+
+
+def project_rows(rows, columns):
+    """Table of `columns` (letters, output order) picked out of rows that start at column A."""
+    return Table.from_rows(rows, [column_letter_to_index(c) - 1 for c in columns])
+
+
+# ===== DELTA SYNC =====
+def _block_range(start_row, start_col, width, top, count):
+    """A1 range of `count` rows of a block, starting `top` rows below its first row."""
+    first = rowcol_to_a1(start_row + top, start_col)
+    last = rowcol_to_a1(start_row + top + count - 1, start_col + width - 1)
+    return f"{first}:{last}"
+
+
+def delta_sync(target_ws, rows, width, start_row=2, start_col=1, old_rows=None):
+    """
+    Writes only the rows of `rows` that differ from what the target tab already holds.
+
+    The current target block is the last-synced state: it is read once (unless
+    `old_rows` is passed in) and both sides are hashed row by row. The two hash
+    lists are aligned by content (difflib.SequenceMatcher), so a row added or
+    removed mid-tab shifts the rows below it instead of rewriting them. Added
+    rows become insertRange, removed rows deleteRange (both shift only the
+    block's columns) and changed rows updateCells, all in ONE
+    spreadsheets.batchUpdate through a WritePlan. Values are written RAW.
+    """
+    first_cell = rowcol_to_a1(start_row, start_col)
+    last_col = rowcol_to_a1(start_row, start_col + width - 1).rstrip("0123456789")
+
+    if old_rows is None:
+        old_rows = target_ws.get(f"{first_cell}:{last_col}", value_render_option="UNFORMATTED_VALUE")
+
+    old_hashes = [row_hash(r, width) for r in old_rows]
+    new_hashes = [row_hash(r, width) for r in rows]
+    opcodes = [op for op in SequenceMatcher(None, old_hashes, new_hashes).get_opcodes() if op[0] != "equal"]
+
+    # the block is longest part-way through when rows are inserted above later deletions
+    length = peak = len(old_rows)
+    for _, i1, i2, j1, j2 in opcodes:
+        length += (j2 - j1) - (i2 - i1)
+        peak = max(peak, length)
+
+    plan = WritePlan(target_ws.spreadsheet)
+    plan._fit(target_ws, start_row - 1 + peak, start_col - 1 + width)
+    changed = inserted = deleted = 0
+    # requests run in order, so block row j1 is where this opcode starts once the earlier ones applied
+    for _, i1, i2, j1, j2 in opcodes:
+        old_n, new_n = i2 - i1, j2 - j1
+        if new_n > old_n:
+            plan.insert_rows(target_ws, _block_range(start_row, start_col, width, j1 + old_n, new_n - old_n))
+            inserted += new_n - old_n
+        elif old_n > new_n:
+            plan.delete_rows(target_ws, _block_range(start_row, start_col, width, j1 + new_n, old_n - new_n))
+            deleted += old_n - new_n
+        if new_n:
+            plan.update(target_ws, rowcol_to_a1(start_row + j1, start_col), [pad_row(r, width) for r in rows[j1:j2]])
+            changed += min(old_n, new_n)
+
+    calls = plan.execute() if opcodes else 0
+    return {"changed": changed, "inserted": inserted, "deleted": deleted, "calls": calls}
+
+
+def _positional_sync(target_ws, old_rows, rows, width, start_row, start_col, value_input_option):
+    """
+    Rewrites the runs of rows that differ at the same position, in one values
+    batch update; rows past the end of `rows` are blanked. For blocks whose rows
+    keep their place (keyed_sync lays them out that way).
+    """
+    old_hashes = [row_hash(r, width) for r in old_rows]
+    new_hashes = [row_hash(r, width) for r in rows]
+
+    data = []
+    changed = 0
+    for start, end in changed_runs(old_hashes, new_hashes):
+        values = []
+        for i in range(start, end):
+            if i < len(rows):
+                values.append(pad_row(rows[i], width))
+                changed += 1
+            else:
+                values.append([""] * width)
+        top = rowcol_to_a1(start_row + start, start_col)
+        bottom = rowcol_to_a1(start_row + end - 1, start_col + width - 1)
+        data.append({"range": f"{top}:{bottom}", "values": values})
+
+    if data:
+        target_ws.batch_update(data, value_input_option=value_input_option)
+
+    return {"changed": changed, "ranges": len(data)}
+
+
+# ===== KEYED UPSERT =====
+def _row_key(row, key_columns):
+    return tuple(str(_normalize(row[i] if i < len(row) else "")).strip() for i in key_columns)
+
+
+def upsert_layout(old_rows, rows, key_columns):
+    """
+    Where every row of `rows` should sit so the fewest target rows change.
+
+    Rows are matched to the target by key; a key appearing several times is
+    matched occurrence by occurrence. Matched rows keep their position, new keys
+    fill the slots of deleted ones and then go at the end, and any slots still
+    empty are closed up by moving the last rows into them, so the block stays
+    contiguous. Returns (layout, inserts, deletes); layout is the new block
+    top to bottom.
+    """
+    positions = {}
+    for i, row in enumerate(old_rows):
+        positions.setdefault(_row_key(row, key_columns), []).append(i)
+
+    layout = [None] * len(old_rows)
+    used = {}
+    inserts = []
+    for row in rows:
+        key = _row_key(row, key_columns)
+        n = used.get(key, 0)
+        used[key] = n + 1
+        if n < len(positions.get(key, ())):
+            layout[positions[key][n]] = row
+        else:
+            inserts.append(row)
+
+    holes = [i for i, row in enumerate(layout) if row is None]
+    deletes = len(holes)
+    for i, row in zip(holes, inserts):
+        layout[i] = row
+    layout.extend(inserts[len(holes):])
+
+    # close remaining holes with the bottom rows
+    holes = holes[len(inserts):]
+    while holes:
+        while layout and layout[-1] is None:
+            layout.pop()
+        if not holes or holes[0] >= len(layout):
+            break
+        layout[holes.pop(0)] = layout.pop()
+    while layout and layout[-1] is None:
+        layout.pop()
+
+    return layout, len(inserts), deletes
+
+
+def keyed_sync(target_ws, rows, width, key_columns, start_row=1, start_col=1,
+               value_input_option="USER_ENTERED", value_render_option="FORMATTED_VALUE"):
+    """
+    Upsert `rows` into the target block by key instead of rewriting it.
+
+    The current block is read once and rows are placed with upsert_layout(),
+    which keeps matched rows where they are; only the rows that then differ at
+    their position (inserted, updated, moved, deleted) are sent — in one values
+    batch update, so USER_ENTERED parsing still applies. `value_render_option`
+    should match how `rows` were read so unchanged cells hash the same.
+    """
+    first_cell = rowcol_to_a1(start_row, start_col)
+    last_col = rowcol_to_a1(start_row, start_col + width - 1).rstrip("0123456789")
+    old_rows = target_ws.get(f"{first_cell}:{last_col}", value_render_option=value_render_option)
+
+    layout, inserts, deletes = upsert_layout(old_rows, rows, key_columns)
+    stats = _positional_sync(target_ws, old_rows, layout, width, start_row, start_col, value_input_option)
+    return dict(stats, inserted=inserts, deleted=deletes)
+
+
+# ===== STREAMING COPY =====
+def stream_copy(source_ws, target_ws, first_col, last_col, start_row=2,
+                window=None, workers=None, value_render_option="UNFORMATTED_VALUE", checkpoint=None):
+    """
+    Copies columns first_col..last_col from `start_row` down onto the same cells of
+    the target, `window` rows at a time. The next window is fetched while earlier
+    ones are being written; at most `workers` writes are in flight, so memory
+    holds about workers + 1 windows however big the tab is.
+
+    The target block is cleared first, as in a full copy. Windows run to the
+    source grid's row_count, so blank rows inside the data don't end the copy.
+    With a `checkpoint` (change_detect.Checkpoint) a rerun skips the clear and
+    the windows that were already written.
+    Returns {"rows": rows copied, "windows": windows read}.
+    """
+    window = window or STREAM_WINDOW_ROWS
+    workers = workers or STREAM_WORKERS
+
+    if not (checkpoint and checkpoint.done("clear")):
+        target_ws.batch_clear([f"{first_col}{start_row}:{last_col}"])
+        if checkpoint:
+            checkpoint.mark("clear")
+
+    def write(top, values):
+        target_ws.update(values=values, range_name=f"{first_col}{top}", value_input_option="RAW")
+        if checkpoint:
+            checkpoint.mark(top)
+
+    rows = windows = 0
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        write = tracing.carry(write)
+        for top in range(start_row, source_ws.row_count + 1, window):
+            if checkpoint and checkpoint.done(top):
+                continue
+            bottom = min(top + window - 1, source_ws.row_count)
+            values = source_ws.get(f"{first_col}{top}:{last_col}{bottom}", value_render_option=value_render_option)
+            windows += 1
+            if not values:
+                continue
+            if len(in_flight) >= workers:
+                in_flight.popleft().result()  # back-pressure: wait for the oldest write
+            in_flight.append(pool.submit(write, top, values))
+            rows += len(values)
+        for future in in_flight:
+            future.result()
+
+    return {"rows": rows, "windows": windows}
+
+
+# ===== WRITE PLANS =====
+def _cell(value):
+    """Python value -> CellData, RAW semantics (strings are never parsed)."""
+    if value is None or value == "":
+        return {}
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+class WritePlan:
+    """
+    Collects clears and value writes for ONE spreadsheet and sends them as a single
+    spreadsheets.batchUpdate, so readers never see the cleared-but-not-yet-written
+    state and the whole thing costs one round-trip.
+
+        plan = WritePlan(spreadsheet)
+        plan.clear(ws, "A:G")
+        plan.update(ws, "A1", rows)
+        plan.execute()
+
+    Values are written RAW. updateCells does not add rows / columns the way
+    values.update does, so a write past the tab's current grid is preceded, in
+    the same batch, by an appendDimension that grows it.
+
+    Plans bigger than WRITE_PLAN_MAX_CELLS are split into several calls, which
+    is NOT atomic. So that readers never see an emptied tab between calls, a
+    split plan does not clear first: the writes under a clear are padded to the
+    clear's columns, overwriting the old rows top-down, and only the rows they
+    leave uncovered are cleared, in the last call. Between calls a reader sees
+    new rows above old ones. With a checkpoint an interrupted run resumes at
+    the next call.
+    """
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.requests = []
+        self.cells = []  # cells per request, for splitting
+        self.grids = {}  # sheetId -> [worksheet, rows, columns] the plan grows the tab to
+
+    def clear(self, worksheet, range_name=None):
+        """Clears values in `range_name` (the whole tab when None); formatting is kept."""
+        grid = a1_range_to_grid_range(range_name, worksheet.id) if range_name else {"sheetId": worksheet.id}
+        self.requests.append({"updateCells": {"range": grid, "fields": "userEnteredValue"}})
+        self.cells.append(0)
+        return self
+
+    def _fit(self, worksheet, rows, columns):
+        """appendDimension requests so the tab has at least `rows` x `columns` cells."""
+        grid = self.grids.setdefault(worksheet.id, [worksheet, worksheet.row_count, worksheet.col_count])
+        for dimension, index, needed in (("ROWS", 1, rows), ("COLUMNS", 2, columns)):
+            if needed > grid[index]:
+                self.requests.append({"appendDimension": {
+                    "sheetId": worksheet.id, "dimension": dimension, "length": needed - grid[index],
+                }})
+                self.cells.append(0)
+                grid[index] = needed
+
+    def update(self, worksheet, range_name, values):
+        if not values:
+            return self
+        grid = a1_range_to_grid_range(range_name, worksheet.id)
+        row0 = grid.get("startRowIndex", 0)
+        width = (values.width if isinstance(values, Table) else max(len(r) for r in values)) or 1
+        self._fit(worksheet, row0 + len(values), grid.get("startColumnIndex", 0) + width)
+        step = max(1, WRITE_PLAN_MAX_CELLS // width)
+        for i in range(0, len(values), step):
+            rows = [{"values": [_cell(v) for v in row]} for row in values[i:i + step]]
+            self.requests.append({"updateCells": {
+                "start": {
+                    "sheetId": worksheet.id,
+                    "rowIndex": row0 + i,
+                    "columnIndex": grid.get("startColumnIndex", 0),
+                },
+                "rows": rows,
+                "fields": "userEnteredValue",
+            }})
+            self.cells.append(sum(len(r["values"]) for r in rows))
+        return self
+
+    def insert_rows(self, worksheet, range_name):
+        """Inserts blank cells over `range_name`, shifting the cells of those columns below it down."""
+        self.requests.append({"insertRange": {
+            "range": a1_range_to_grid_range(range_name, worksheet.id), "shiftDimension": "ROWS",
+        }})
+        self.cells.append(0)
+        return self
+
+    def delete_rows(self, worksheet, range_name):
+        """Removes the cells of `range_name`, shifting the cells of those columns below it up."""
+        self.requests.append({"deleteRange": {
+            "range": a1_range_to_grid_range(range_name, worksheet.id), "shiftDimension": "ROWS",
+        }})
+        self.cells.append(0)
+        return self
+
+    def format(self, worksheet, range_name, cell_format):
+        """Applies a CellFormat dict (e.g. backgroundColor, textFormat) to `range_name`."""
+        self.requests.append({"repeatCell": {
+            "range": a1_range_to_grid_range(range_name, worksheet.id),
+            "cell": {"userEnteredFormat": cell_format},
+            "fields": "userEnteredFormat(" + ",".join(cell_format) + ")",
+        }})
+        self.cells.append(0)
+        return self
+
+    def _clear_last(self):
+        """Rewrites the plan for a split send: clears become padded writes plus tail clears at the end."""
+        requests, tails = [], []
+        for n, request in enumerate(self.requests):
+            grid = request.get("updateCells", {}).get("range")
+            if grid is None:
+                requests.append(request)
+                continue
+            sheet = grid["sheetId"]
+            r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex")
+            c0 = grid.get("startColumnIndex", 0)
+            c1 = grid.get("endColumnIndex", self.grids[sheet][2] if sheet in self.grids else None)
+            writes = sorted(
+                (r["updateCells"] for r in self.requests[n + 1:]
+                 if "start" in r.get("updateCells", {}) and r["updateCells"]["start"]["sheetId"] == sheet),
+                key=lambda w: w["start"].get("rowIndex", 0),
+            )
+            spans = [(w["start"].get("rowIndex", 0), w["start"].get("rowIndex", 0) + len(w["rows"])) for w in writes]
+            inside = all(r0 <= top and (r1 is None or bottom <= r1) for top, bottom in spans)
+            disjoint = all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+            if c1 is None or not writes or not inside or not disjoint:
+                requests.append(request)  # nothing to overwrite with: clear first, as usual
+                continue
+
+            for w in writes:
+                left = w["start"].get("columnIndex", 0)
+                if left > c0:
+                    for row in w["rows"]:
+                        row["values"] = [{}] * (left - c0) + row["values"]
+                    w["start"]["columnIndex"] = left = c0
+                for row in w["rows"]:
+                    if left + len(row["values"]) < c1:
+                        row["values"] = row["values"] + [{}] * (c1 - left - len(row["values"]))
+
+            # rows between / below the writes are cleared once everything is written
+            top = r0
+            for first, end in spans + [(r1, None)]:
+                if first is None or first > top:
+                    tail = {"sheetId": sheet, "startRowIndex": top, "startColumnIndex": c0, "endColumnIndex": c1}
+                    if first is not None:
+                        tail["endRowIndex"] = first
+                    tails.append({"updateCells": {"range": tail, "fields": "userEnteredValue"}})
+                top = end
+        self.requests = requests + tails
+        self.cells = [
+            sum(len(row["values"]) for row in r["updateCells"]["rows"]) if "rows" in r.get("updateCells", {}) else 0
+            for r in self.requests
+        ]
+
+    def execute(self, checkpoint=None, step=""):
+        """
+        Sends the plan; returns the number of batchUpdate calls made. With a
+        `checkpoint` (change_detect.Checkpoint) each call is recorded as step
+        f"{step}{n}" and calls already made by a failed earlier run are skipped.
+        """
+        if sum(self.cells) > WRITE_PLAN_MAX_CELLS:
+            self._clear_last()
+        batches, current, size = [], [], 0
+        for request, cells in zip(self.requests, self.cells):
+            if current and size + cells > WRITE_PLAN_MAX_CELLS:
+                batches.append(current)
+                current, size = [], 0
+            current.append(request)
+            size += cells
+        if current:
+            batches.append(current)
+        if len(batches) > 1:
+            print(f"⚠️ WritePlan: {sum(self.cells):,} cells go out as {len(batches)} batchUpdates "
+                  f"(WRITE_PLAN_MAX_CELLS={WRITE_PLAN_MAX_CELLS:,}); not atomic, old rows are overwritten "
+                  f"in place and the tail cleared last")
+
+        sent = 0
+        for n, batch in enumerate(batches):
+            if checkpoint and checkpoint.done(f"{step}{n}"):
+                continue
+            self.spreadsheet.batch_update({"requests": batch})
+            sent += 1
+            if checkpoint:
+                checkpoint.mark(f"{step}{n}")
+        for worksheet, rows, columns in self.grids.values():
+            # keep gspread's cached gridProperties in step with the appendDimensions
+            properties = getattr(worksheet, "_properties", None)
+            if properties is not None:
+                grid = properties.setdefault("gridProperties", {})
+                grid["rowCount"], grid["columnCount"] = rows, columns
+        self.requests, self.cells, self.grids = [], [], {}
+        return sent
@@ -0,0 +1,132 @@
+"""
+Small key -> JSON state stores shared by the jobs (change detection, checkpoints).
+
+FileStateStore keeps a local JSON file; SheetStateStore keeps one row per key in a
+hidden tab so the state survives between GitHub Actions runs.
+
+Jobs that write the same tabs must share one store: a fingerprint only says what
+the target holds if every writer of that target records into it. The workflows
+therefore restore one cache (not one per workflow), or use STATE_SHEET_ID.
+"""
+import os
+import json
+import threading
+
+STATE_FILE = os.environ.get("STATE_FILE", ".sheet_state.json")
+STATE_SHEET_ID = os.environ.get("STATE_SHEET_ID")
+STATE_TAB = os.environ.get("STATE_TAB", "_sync_state")
+
+
+class FileStateStore:
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()[key] = value
+            self._save()
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp, self.path)
+
+
+class SheetStateStore:
+    def __init__(self, spreadsheet_id=STATE_SHEET_ID, tab=STATE_TAB):
+        self.spreadsheet_id = spreadsheet_id
+        self.tab = tab
+        self._lock = threading.Lock()
+        self._ws = None
+        self._data = None
+        self._height = 0  # rows the tab holds, so a shorter save can blank the rest
+
+    def _worksheet(self):
+        import gspread
+        import gsheet_client
+
+        if self._ws is None:
+            try:
+                self._ws = gsheet_client.open_worksheet(self.spreadsheet_id, self.tab)
+            except gspread.exceptions.WorksheetNotFound:
+                spreadsheet = gsheet_client.open_spreadsheet(self.spreadsheet_id)
+                self._ws = spreadsheet.add_worksheet(self.tab, rows=100, cols=2)
+                self._ws.hide()
+        return self._ws
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            rows = self._worksheet().get("A:B")
+            self._height = len(rows)
+            for row in rows:
+                if len(row) > 1 and row[0]:
+                    try:
+                        self._data[row[0]] = json.loads(row[1])
+                    except ValueError:
+                        pass
+        return self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load().get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()[key] = value
+            self._save()
+
+    def delete(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        # one values write: the rows, then blanks over whatever the last save left below them
+        rows = [[k, json.dumps(v, sort_keys=True, default=str)] for k, v in sorted(self._data.items())]
+        height = len(rows)
+        rows += [["", ""]] * (self._height - height)
+        if rows:
+            self._worksheet().update(values=rows, range_name=f"A1:B{len(rows)}")
+        self._height = height
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Sheet store when STATE_SHEET_ID is set, otherwise the local JSON file."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SheetStateStore() if STATE_SHEET_ID else FileStateStore()
+        return _default
+
+
+def set_default_store(store):
+    """Point every job at another store (e.g. a throwaway file for offline runs)."""
+    global _default
+    with _default_lock:
+        _default = store
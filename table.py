@@ -0,0 +1,113 @@
+"""
+Column-major table for the rows that flow through the jobs.
+
+A Table holds one sequence per column: usually the plain lists of a
+majorDimension=COLUMNS response, though any sequence (array.array for numbers)
+works. Projection
+(`select`) and filtering (`where`, slicing) return views that share those
+columns; only `to_rows()` / iteration build row lists, once, at the point
+gspread or a WritePlan needs them.
+
+    table = Table(columns)                 # columns as fetched, no copy
+    body = table[1:].where(1, bool)        # skip header, keep rows with column 1 set
+    plan.update(ws, "A1", body)            # rows are built only while the request is assembled
+"""
+from array import array
+
+
+class Table:
+    __slots__ = ("columns", "index", "height")
+
+    def __init__(self, columns, index=None, height=None):
+        """
+        `columns` are equal-length sequences; short ones (Sheets trims trailing
+        blanks) are replaced by padded list copies, so the caller's sequences
+        are never changed. `index` = row numbers of a view (a range for plain
+        slices, an array otherwise).
+        """
+        self.columns = list(columns)
+        if height is None:
+            height = max((len(c) for c in self.columns), default=0)
+            self.columns = [
+                c if len(c) == height else list(c) + [""] * (height - len(c)) for c in self.columns
+            ]
+        self.height = height
+        self.index = index
+
+    @classmethod
+    def from_rows(cls, rows, positions=None):
+        """Transposes row-major data; `positions` (0-based) picks and orders columns."""
+        if positions is None:
+            positions = range(max((len(r) for r in rows), default=0))
+        return cls([[r[i] if i < len(r) else "" for r in rows] for i in positions], height=len(rows))
+
+    @classmethod
+    def of(cls, data):
+        return data if isinstance(data, cls) else cls.from_rows(data)
+
+    # ----- shape -----
+    def __len__(self):
+        return self.height if self.index is None else len(self.index)
+
+    @property
+    def width(self):
+        return len(self.columns)
+
+    # ----- views -----
+    def column(self, position):
+        """Values of one column (the shared list itself when this is not a filtered view)."""
+        column = self.columns[position]
+        if self.index is None:
+            return column
+        if isinstance(self.index, range):  # plain slice: let the list do it
+            return column[self.index.start:self.index.stop:self.index.step]
+        return [column[i] for i in self.index]
+
+    def select(self, *positions):
+        """Projection: a table of the given columns, in that order, sharing them."""
+        return Table([self.columns[p] for p in positions], self.index, self.height)
+
+    def filter(self, mask):
+        """Rows whose entry in `mask` (one bool per row) is true."""
+        rows = self.index if self.index is not None else range(self.height)
+        return Table(self.columns, array("l", (r for r, keep in zip(rows, mask) if keep)), self.height)
+
+    def where(self, position, predicate):
+        """Rows whose value in column `position` satisfies `predicate`."""
+        return self.filter([predicate(v) for v in self.column(position)])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            rows = self.index if self.index is not None else range(self.height)
+            return Table(self.columns, rows[key], self.height)  # range or array view
+        return self.row(key)
+
+    # ----- rows -----
+    def row(self, n):
+        i = n if self.index is None else self.index[n]
+        return [c[i] for c in self.columns]
+
+    def __iter__(self):
+        rows = self.index if self.index is not None else range(self.height)
+        columns = self.columns
+        for i in rows:
+            yield [c[i] for c in columns]
+
+    def to_rows(self):
+        """list-of-lists for gspread."""
+        if self.index is None:
+            return [list(r) for r in zip(*self.columns)] if self.columns else []
+        return list(self)
+
+    @classmethod
+    def concat(cls, tables):
+        """Stacks tables of the same width (copies the selected rows once)."""
+        tables = list(tables)
+        if not tables:
+            return cls([])
+        width = max(t.width for t in tables)
+        columns = [[] for _ in range(width)]
+        for t in tables:
+            for p in range(width):
+                columns[p].extend(t.column(p) if p < t.width else [""] * len(t))
+        return cls(columns, height=sum(len(t) for t in tables))
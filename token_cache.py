@@ -0,0 +1,121 @@
+"""
+Access-token sharing for the service-account credentials.
+
+gsheet_client authorizes one client per process, so every job in a run uses the
+same credentials object. google-auth refreshes the token a few minutes before
+it expires, on whichever request finds it stale. `attach()` adds two things:
+
+* one refresh at a time: threads that find the token stale together wait for
+  the first one's token exchange instead of each making their own;
+* optionally, a token file shared between runs and scripts (GSHEET_TOKEN_CACHE).
+  The token and its expiry are stored per service account + scopes in a file
+  only the owner can read (0600). The next process reuses a token with at
+  least GSHEET_TOKEN_MIN_TTL seconds left instead of exchanging the key again.
+  A file other users can read is ignored.
+
+The file holds bearer tokens: keep it out of shared caches (e.g. actions/cache
+in a repository that runs workflows for forks).
+"""
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+TOKEN_CACHE = os.environ.get("GSHEET_TOKEN_CACHE", "")  # path; "" = in-process only
+MIN_TTL = float(os.environ.get("GSHEET_TOKEN_MIN_TTL", "300"))  # seconds
+
+_file_lock = threading.Lock()
+
+
+def _utcnow():
+    # google-auth keeps `expiry` as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _key(creds):
+    account = getattr(creds, "service_account_email", None) or type(creds).__name__
+    return f"{account} {' '.join(sorted(getattr(creds, 'scopes', None) or []))}"
+
+
+def _read_all(path):
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return {}
+    if mode & 0o077:
+        print(f"⚠️ Token cache {path} is readable by other users, ignoring it")
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def read(path, key):
+    """(token, expiry) cached under `key`, or None when missing or due to expire within MIN_TTL."""
+    entry = _read_all(path).get(key)
+    if not entry:
+        return None
+    try:
+        expiry = datetime.fromisoformat(entry["expiry"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (expiry - _utcnow()).total_seconds() < MIN_TTL:
+        return None
+    return entry["token"], expiry
+
+
+def write(path, key, token, expiry):
+    """Stores the token under `key` (dropping expired entries). Never raises."""
+    if not token or not expiry:
+        return
+    with _file_lock:
+        try:
+            now = _utcnow()
+            entries = {
+                k: v for k, v in _read_all(path).items()
+                if isinstance(v, dict) and v.get("expiry", "") > now.isoformat()
+            }
+            entries[key] = {"token": token, "expiry": expiry.isoformat()}
+
+            folder = os.path.dirname(os.path.abspath(path))
+            os.makedirs(folder, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Could not write token cache {path} ({e})")
+
+
+def attach(creds, path=None):
+    """
+    Makes `creds` refresh one thread at a time and, with a cache `path`
+    (default GSHEET_TOKEN_CACHE), start from a cached token and store every
+    token it mints. Returns `creds`.
+    """
+    path = TOKEN_CACHE if path is None else path
+    key = _key(creds)
+    if path:
+        cached = read(path, key)
+        if cached:
+            creds.token, creds.expiry = cached
+            minutes = (creds.expiry - _utcnow()).total_seconds() / 60
+            print(f"🔑 Reusing cached access token ({minutes:.0f} min left)")
+
+    refresh = creds.refresh
+    lock = threading.Lock()
+
+    def shared_refresh(request):
+        seen = creds.token
+        with lock:
+            if creds.token != seen and creds.valid:  # another thread refreshed while this one waited
+                return
+            refresh(request)
+            if path:
+                write(path, key, creds.token, creds.expiry)
+
+    creds.refresh = shared_refresh
+    return creds
@@ -0,0 +1,272 @@
+"""
+Per-job tracing of Sheets traffic.
+
+Every HTTP call made through gsheet_client is recorded as a span (operation,
+range, duration, rows / cells moved, payload bytes) tagged with the job and phase
+that made it. Jobs mark their phases with `tracing.phase("fetch" | "transform" |
+"write")`. At exit a JSON report is written to TRACE_FILE and, on GitHub Actions,
+a summary table is appended to the step summary (TRACE_SUMMARY=0 to skip).
+"""
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+TRACE_FILE = os.environ.get("TRACE_FILE", "trace_report.json")
+TRACE_SUMMARY = os.environ.get("TRACE_SUMMARY", "1") != "0"
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = []
+_jobs = {}
+_started = time.time()
+_registered = False
+
+
+# ===== CONTEXT =====
+def _current():
+    return getattr(_local, "job", None) or "main", getattr(_local, "phase", None)
+
+
+def _job_entry(name):
+    return _jobs.setdefault(name, {"seconds": 0.0, "phases": {}})
+
+
+def _close_phase():
+    job, phase = _current()
+    start = getattr(_local, "phase_start", None)
+    if phase and start is not None:
+        with _lock:
+            phases = _job_entry(job)["phases"]
+            phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+    _local.phase = None
+    _local.phase_start = None
+
+
+def phase(name):
+    """Start the named phase of the current job (ends the previous one)."""
+    _close_phase()
+    _local.phase = name
+    _local.phase_start = time.perf_counter()
+
+
+@contextmanager
+def job(name):
+    """Tag everything inside with `name` and time it."""
+    _register()
+    outer = (getattr(_local, "job", None), getattr(_local, "phase", None), getattr(_local, "phase_start", None))
+    _local.job, _local.phase, _local.phase_start = name, None, None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _close_phase()
+        with _lock:
+            _job_entry(name)["seconds"] += time.perf_counter() - start
+        _local.job, _local.phase, _local.phase_start = outer
+
+
+def carry(func):
+    """Wrap `func` so calls made from a worker thread are tagged with the caller's job / phase."""
+    job_name, phase_name = getattr(_local, "job", None), getattr(_local, "phase", None)
+
+    def run(*args, **kwargs):
+        outer = (getattr(_local, "job", None), getattr(_local, "phase", None), getattr(_local, "phase_start", None))
+        _local.job, _local.phase, _local.phase_start = job_name, phase_name, None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.job, _local.phase, _local.phase_start = outer
+
+    return run
+
+
+# ===== SPANS =====
+_VALUES_RE = re.compile(r"/values/([^/:?]+)")
+
+
+def _operation(method, url):
+    method = method.lower()
+    if "googleapis.com/drive" in url:
+        return "drive_metadata"
+    if ":batchGet" in url:
+        return "batch_get"
+    if ":batchClear" in url:
+        return "batch_clear"
+    if "values:batchUpdate" in url:
+        return "batch_update"
+    if ":batchUpdate" in url:
+        return "spreadsheet_batch_update"
+    if ":clear" in url:
+        return "clear"
+    if ":append" in url:
+        return "append"
+    if "/values/" in url:
+        return "get" if method == "get" else "update"
+    return "metadata"
+
+
+def _direction(op):
+    if op in ("get", "batch_get"):
+        return "read"
+    if op in ("metadata", "drive_metadata"):
+        return "meta"
+    return "write"
+
+
+def _ranges(url, params, body):
+    found = _VALUES_RE.search(url)
+    if found and ":batch" not in url:
+        return [unquote(found.group(1))]
+    if params and "ranges" in params:
+        return list(params["ranges"])
+    if body:
+        if "data" in body:
+            return [d.get("range") for d in body["data"]]
+        if "ranges" in body:
+            return list(body["ranges"])
+    return []
+
+
+def _grid_size(value_ranges):
+    rows = cells = 0
+    for values in value_ranges:
+        rows += len(values)
+        cells += sum(len(r) for r in values)
+    return rows, cells
+
+
+def record_http(method, url, params, body, response, seconds):
+    """Called by the HTTP client after every Sheets / Drive call."""
+    _register()
+    op = _operation(method, url)
+    sent = received = None
+    payload = None
+    if response is not None:
+        received = len(response.content or b"")
+        if op in ("get", "batch_get"):
+            payload = response.json()
+            # gspread parses the same response again right after; hand it the parsed copy
+            response.json = lambda **kwargs: payload
+
+    if op == "get" and payload:
+        rows, cells = _grid_size([payload.get("values", [])])
+    elif op == "batch_get" and payload:
+        rows, cells = _grid_size(v.get("values", []) for v in payload.get("valueRanges", []))
+    elif body and "values" in body:
+        rows, cells = _grid_size([body["values"]])
+    elif body and "data" in body:
+        rows, cells = _grid_size(d.get("values", []) for d in body["data"])
+    elif body and "requests" in body:
+        rows, cells = _grid_size(
+            [row.get("values", []) for row in r["updateCells"].get("rows", [])]
+            for r in body["requests"] if "updateCells" in r
+        )
+    else:
+        rows = cells = 0
+
+    request = getattr(response, "request", None)
+    if request is not None and request.body:
+        sent = len(request.body)  # what requests actually put on the wire
+
+    job_name, phase_name = _current()
+    span = {
+        "job": job_name,
+        "phase": phase_name,
+        "op": op,
+        "ranges": _ranges(url, params, body),
+        "seconds": round(seconds, 4),
+        "status": getattr(response, "status_code", None),
+        "direction": _direction(op),
+        "rows": rows,
+        "cells": cells,
+        "bytes_sent": sent or 0,
+        "bytes_received": received or 0,
+    }
+    with _lock:
+        _spans.append(span)
+
+
+# ===== REPORT =====
+def report():
+    with _lock:
+        spans = list(_spans)
+        jobs = {k: {"seconds": v["seconds"], "phases": dict(v["phases"])} for k, v in _jobs.items()}
+
+    for span in spans:
+        entry = jobs.setdefault(span["job"], {"seconds": 0.0, "phases": {}})
+        totals = entry.setdefault("totals", {
+            "calls": 0, "api_seconds": 0.0, "cells_read": 0, "cells_written": 0,
+            "bytes_sent": 0, "bytes_received": 0,
+        })
+        totals["calls"] += 1
+        totals["api_seconds"] += span["seconds"]
+        if span["direction"] == "read":
+            totals["cells_read"] += span["cells"]
+        elif span["direction"] == "write":
+            totals["cells_written"] += span["cells"]
+        totals["bytes_sent"] += span["bytes_sent"]
+        totals["bytes_received"] += span["bytes_received"]
+
+    for entry in jobs.values():
+        entry["seconds"] = round(entry["seconds"], 3)
+        entry["phases"] = {k: round(v, 3) for k, v in entry["phases"].items()}
+        if "totals" in entry:
+            entry["totals"]["api_seconds"] = round(entry["totals"]["api_seconds"], 3)
+
+    return {
+        "started": datetime.fromtimestamp(_started, timezone.utc).isoformat(),
+        "total_seconds": round(time.time() - _started, 3),
+        "jobs": jobs,
+        "slowest_calls": sorted(spans, key=lambda s: s["seconds"], reverse=True)[:5],
+        "spans": spans,
+    }
+
+
+def _markdown(data):
+    lines = [
+        "### Sheets trace",
+        "",
+        "| job | seconds | fetch | transform | write | calls | cells read | cells written | KB sent | KB received |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for name, entry in data["jobs"].items():
+        t = entry.get("totals", {})
+        p = entry["phases"]
+        lines.append(
+            f"| {name} | {entry['seconds']} | {p.get('fetch', '')} | {p.get('transform', '')} | {p.get('write', '')} "
+            f"| {t.get('calls', 0)} | {t.get('cells_read', 0):,} | {t.get('cells_written', 0):,} "
+            f"| {t.get('bytes_sent', 0) / 1024:.1f} | {t.get('bytes_received', 0) / 1024:.1f} |"
+        )
+    lines += ["", "**Slowest calls**", "", "| job | op | ranges | seconds | cells |", "|---|---|---|---|---|"]
+    for s in data["slowest_calls"]:
+        lines.append(f"| {s['job']} | {s['op']} | {', '.join(r for r in s['ranges'] if r)} | {s['seconds']} | {s['cells']:,} |")
+    return "\n".join(lines) + "\n"
+
+
+def emit_report():
+    if not _spans and not _jobs:
+        return
+    data = report()
+    with open(TRACE_FILE, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+    print(f"📊 Trace report written to {TRACE_FILE}")
+
+    summary = os.environ.get("GITHUB_STEP_SUMMARY")
+    if TRACE_SUMMARY and summary:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(_markdown(data))
+
+
+def _register():
+    global _registered
+    if not _registered:
+        with _lock:
+            if not _registered:
+                atexit.register(emit_report)
+                _registered = True